@@ -1,13 +1,33 @@
 #! /usr/bin/env python3
 
 import aiomysql
-import json
+import orjson
 import asyncio
+import struct
+import time
 import logging
 from aiogram import types
 
 logger = logging.getLogger(__name__)
 
+_pool = None
+
+async def init_pool(config, minsize=2, maxsize=16):
+    global _pool
+    if _pool is None:
+        logger.info(f"Creating database connection pool (minsize={minsize}, maxsize={maxsize})")
+        # autocommit spares the read-only helpers the implicit BEGIN/COMMIT
+        # aiomysql wraps around every statement; writers still call
+        # conn.commit() explicitly, which is a no-op in this mode.
+        _pool = await aiomysql.create_pool(minsize=minsize, maxsize=maxsize, pool_recycle=3600,
+                                           autocommit=True, **config)
+    return _pool
+
+# Connectivity-class MySQL errnos worth retrying: can't connect, server
+# gone away, lost connection, socket error. Auth/unknown-db failures are
+# permanent and retrying them just stalls startup.
+RETRYABLE_CONNECTION_ERRNOS = (2002, 2003, 2006, 2013)
+
 async def get_db_connection(config, max_retries=3, retry_delay=5):
     for attempt in range(max_retries):
         try:
@@ -15,15 +35,71 @@ async def get_db_connection(config, max_retries=3, retry_delay=5):
             return await aiomysql.connect(**config)
         except aiomysql.Error as e:
             logger.error(f"Database connection failed (attempt {attempt + 1}/{max_retries}): {e}")
+            errno = e.args[0] if e.args else None
+            if errno not in RETRYABLE_CONNECTION_ERRNOS:
+                raise
             if attempt < max_retries - 1:
-                await asyncio.sleep(retry_delay)
+                await asyncio.sleep(min(retry_delay * 2 ** attempt, 10))
             else:
                 raise Exception("Failed to connect to database after retries")
 
+async def ensure_index(cursor, table: str, index_name: str, columns: str):
+    await cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    """, (table, index_name))
+    result = await cursor.fetchone()
+    if result and result[0] == 0:
+        await cursor.execute(f"ALTER TABLE {table} ADD INDEX {index_name} {columns}")
+        logger.info(f"Added index {index_name} on {table}")
+
+async def ensure_column(cursor, table: str, column: str, definition: str):
+    await cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    result = await cursor.fetchone()
+    if result and result[0] == 0:
+        await cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        logger.info(f"Added column {table}.{column}")
+
+async def ensure_column_type(cursor, table: str, column: str, data_type: str):
+    await cursor.execute("""
+        SELECT DATA_TYPE FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    result = await cursor.fetchone()
+    if result and result[0].lower() != data_type.lower():
+        await cursor.execute(f"ALTER TABLE {table} MODIFY {column} {data_type}")
+        logger.info(f"Converted {table}.{column} to {data_type} column")
+
+SCHEMA_TABLES = ('contests', 'contest_prizes', 'prizes', 'prize_claims', 'giveaway_state',
+                 'contest_participants')
+
+async def _run_schema_migrations(cursor):
+    await ensure_index(cursor, 'prize_claims', 'idx_claims_user_unclaimed',
+                       '(winner_user_id, claimed_at)')
+    await ensure_index(cursor, 'prize_claims', 'idx_claims_contest_winner',
+                       '(contest_id, winner_user_id)')
+    await ensure_column_type(cursor, 'giveaway_state', 'participants', 'JSON')
+    await ensure_column_type(cursor, 'giveaway_state', 'claimed_winners', 'MEDIUMBLOB')
+    await ensure_column(cursor, 'giveaway_state', 'end_at', 'BIGINT')
+
 async def init_database(config):
     conn = await get_db_connection(config)
     try:
         async with conn.cursor() as cursor:
+            await cursor.execute("""
+                SELECT COUNT(*) FROM information_schema.tables
+                WHERE table_schema = DATABASE() AND table_name IN %s
+            """, (SCHEMA_TABLES,))
+            result = await cursor.fetchone()
+            if result and result[0] == len(SCHEMA_TABLES):
+                await _run_schema_migrations(cursor)
+                await conn.commit()
+                logger.info("Database tables already initialized, skipping DDL")
+                return
+
             await cursor.execute("""
                 CREATE TABLE IF NOT EXISTS contests (
                     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -74,26 +150,40 @@ async def init_database(config):
                     prize_id INT,
                     FOREIGN KEY (contest_id) REFERENCES contests(id) ON DELETE CASCADE,
                     FOREIGN KEY (prize_id) REFERENCES prizes(id) ON DELETE SET NULL,
-                    UNIQUE KEY unique_winner_prize (contest_id, position, winner_user_id)
+                    UNIQUE KEY unique_winner_prize (contest_id, position, winner_user_id),
+                    KEY idx_claims_user_unclaimed (winner_user_id, claimed_at),
+                    KEY idx_claims_contest_winner (contest_id, winner_user_id)
                 )
             """)
-            
+
             await cursor.execute("""
                 CREATE TABLE IF NOT EXISTS giveaway_state (
                     id INT AUTO_INCREMENT PRIMARY KEY,
-                    participants TEXT,
+                    participants JSON,
                     winners TEXT,
-                    claimed_winners TEXT,
+                    claimed_winners MEDIUMBLOB,
                     giveaway_message_id BIGINT,
                     giveaway_chat_id BIGINT,
                     giveaway_has_image BOOLEAN DEFAULT FALSE,
                     current_contest_id INT,
+                    end_at BIGINT,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
                 )
             """)
-            
+
+            await cursor.execute("""
+                CREATE TABLE IF NOT EXISTS contest_participants (
+                    contest_id INT NOT NULL,
+                    user_id BIGINT NOT NULL,
+                    user_json JSON,
+                    PRIMARY KEY (contest_id, user_id)
+                )
+            """)
+
+            await _run_schema_migrations(cursor)
+
             await cursor.execute("""
-                INSERT IGNORE INTO giveaway_state (id, participants, winners, claimed_winners, 
+                INSERT IGNORE INTO giveaway_state (id, participants, winners, claimed_winners,
                 giveaway_message_id, giveaway_chat_id, giveaway_has_image, current_contest_id)
                 VALUES (1, '[]', '{}', '[]', NULL, NULL, FALSE, NULL)
             """)
@@ -107,37 +197,27 @@ async def init_database(config):
         conn.close()
 
 async def get_contest_by_id(contest_id: int, config):
-    conn = await get_db_connection(config)
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
+        async with pool.acquire() as conn, conn.cursor(aiomysql.DictCursor) as cursor:
             await cursor.execute(
-                "SELECT contest_name, duration, winners_count, prizes, image_url, group_title, group_url FROM contests WHERE id = %s",
+                "SELECT contest_name AS name, duration, winners_count, prizes, image_url, group_title, group_url FROM contests WHERE id = %s",
                 (contest_id,)
             )
-            result = await cursor.fetchone()
-            if result:
-                contest = {
-                    'name': result[0],
-                    'duration': result[1],
-                    'winners_count': result[2],
-                    'prizes': result[3].split(',') if result[3] else [],
-                    'image_url': result[4],
-                    'group_title': result[5],
-                    'group_url': result[6]
-                }
+            contest = await cursor.fetchone()
+            if contest:
+                contest['prizes'] = contest['prizes'].split(',') if contest['prizes'] else []
                 logger.info(f"Retrieved contest {contest_id}: {contest['name']} with group info: {contest['group_title']}")
                 return contest
             return None
     except Exception as e:
         logger.error(f"Error getting contest {contest_id}: {e}")
         raise
-    finally:
-        conn.close()
 
 async def add_contest(contest_name: str, duration: int, winners_count: int, prizes: list, config, image_url: str = None, group_title: str = None, group_url: str = None):
-    conn = await get_db_connection(config)
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
+        async with pool.acquire() as conn, conn.cursor() as cursor:
             prizes_str = ','.join(prizes) if prizes else ''
             await cursor.execute(
                 "INSERT INTO contests (contest_name, duration, winners_count, prizes, image_url, group_title, group_url) VALUES (%s, %s, %s, %s, %s, %s, %s)",
@@ -150,29 +230,16 @@ async def add_contest(contest_name: str, duration: int, winners_count: int, priz
     except Exception as e:
         logger.error(f"Error creating contest: {e}")
         raise
-    finally:
-        conn.close()
 
 async def list_contests(config):
-    conn = await get_db_connection(config)
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute("SELECT id, contest_name, duration, winners_count FROM contests ORDER BY id")
-            results = await cursor.fetchall()
-            contests = []
-            for row in results:
-                contests.append({
-                    'id': row[0],
-                    'name': row[1],
-                    'duration': row[2],
-                    'winners_count': row[3]
-                })
-            return contests
+        async with pool.acquire() as conn, conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute("SELECT id, contest_name AS name, duration, winners_count FROM contests ORDER BY id")
+            return await cursor.fetchall()
     except Exception as e:
         logger.error(f"Error listing contests: {e}")
         raise
-    finally:
-        conn.close()
 
 def serialize_user(user: types.User) -> dict:
     return {
@@ -187,129 +254,264 @@ def serialize_user(user: types.User) -> dict:
 def deserialize_user(data: dict) -> types.User:
     return types.User(**{k: v for k, v in data.items() if v is not None})
 
-async def save_state_to_db(participants, winners, claimed_winners, giveaway_message_id, giveaway_chat_id, giveaway_has_image, current_contest_id, config):
-    conn = await get_db_connection(config)
+# Hot-path SQL is kept in module-level constants: aiomysql has no
+# server-side prepared statements, but byte-identical statement text lets
+# MySQL reuse its digest/plan caches and saves rebuilding the literal per
+# call.
+SAVE_STATE_SQL = """
+    INSERT INTO giveaway_state
+    (id, participants, winners, claimed_winners, giveaway_message_id, giveaway_chat_id, giveaway_has_image, current_contest_id, end_at)
+    VALUES (1, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+    participants = VALUES(participants), winners = VALUES(winners),
+    claimed_winners = VALUES(claimed_winners),
+    giveaway_message_id = VALUES(giveaway_message_id),
+    giveaway_chat_id = VALUES(giveaway_chat_id),
+    giveaway_has_image = VALUES(giveaway_has_image),
+    current_contest_id = VALUES(current_contest_id),
+    end_at = VALUES(end_at)
+"""
+
+IS_PRIZE_CLAIMED_SQL = """
+    SELECT claimed_at FROM prize_claims
+    WHERE contest_id = %s AND position = %s
+"""
+
+LATEST_UNCLAIMED_PRIZE_SQL = """
+    SELECT cp.contest_id, cp.position, cp.prize_name, cp.prize_type, cp.prize_value,
+           pc.security_code
+    FROM contest_prizes cp
+    JOIN prize_claims pc ON cp.contest_id = pc.contest_id AND cp.position = pc.position
+    WHERE pc.winner_user_id = %s AND pc.claimed_at IS NULL
+    ORDER BY pc.contest_id DESC, cp.position ASC
+    LIMIT 1
+"""
+
+async def save_state_to_db(participants, winners, claimed_winners, giveaway_message_id, giveaway_chat_id, giveaway_has_image, current_contest_id, config, participants_json=None, winners_json=None, claimed_winners_blob=None, end_at=None):
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
-            participants_json = json.dumps([serialize_user(u) for u in participants.values()])
-            winners_json = json.dumps(winners)
-            claimed_winners_json = json.dumps(list(claimed_winners))
-            
-            await cursor.execute("""
-                UPDATE giveaway_state SET 
-                participants = %s, winners = %s, claimed_winners = %s,
-                giveaway_message_id = %s, giveaway_chat_id = %s, giveaway_has_image = %s,
-                current_contest_id = %s
-                WHERE id = 1
-            """, (participants_json, winners_json, claimed_winners_json, 
-                  giveaway_message_id, giveaway_chat_id, giveaway_has_image, current_contest_id))
-            
-            if cursor.rowcount == 0:
-                await cursor.execute("""
-                    INSERT IGNORE INTO giveaway_state 
-                    (id, participants, winners, claimed_winners, giveaway_message_id, giveaway_chat_id, giveaway_has_image, current_contest_id)
-                    VALUES (1, %s, %s, %s, %s, %s, %s, %s)
-                """, (participants_json, winners_json, claimed_winners_json,
-                      giveaway_message_id, giveaway_chat_id, giveaway_has_image, current_contest_id))
+        async with pool.acquire() as conn, conn.cursor() as cursor:
+            if participants_json is None:
+                participants_json = orjson.dumps([serialize_user(u) for u in participants.values()]).decode()
+            if winners_json is None:
+                # winners is keyed by int user ids; orjson rejects
+                # non-string keys unless told otherwise.
+                winners_json = orjson.dumps(winners, option=orjson.OPT_NON_STR_KEYS).decode()
+            if claimed_winners_blob is None:
+                claimed_winners_blob = struct.pack(f'<{len(claimed_winners)}q', *claimed_winners)
             
+            await cursor.execute(SAVE_STATE_SQL,
+                 (participants_json, winners_json, claimed_winners_blob,
+                  giveaway_message_id, giveaway_chat_id, giveaway_has_image, current_contest_id,
+                  end_at))
+
             await conn.commit()
             logger.info("State saved to database")
     except Exception as e:
         logger.error(f"Error saving state to database: {e}")
         raise
-    finally:
-        conn.close()
 
-async def load_state_from_db(config):
-    conn = await get_db_connection(config)
+ADD_CONTEST_PARTICIPANT_SQL = """
+    INSERT IGNORE INTO contest_participants (contest_id, user_id, user_json)
+    VALUES (%s, %s, %s)
+"""
+
+async def add_contest_participant(contest_id: int, user_id: int, user_json: str, config):
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
+        async with pool.acquire() as conn, conn.cursor() as cursor:
+            await cursor.execute(ADD_CONTEST_PARTICIPANT_SQL, (contest_id, user_id, user_json))
+            await conn.commit()
+    except Exception as e:
+        logger.error(f"Error adding participant {user_id} to contest {contest_id}: {e}")
+        raise
+
+async def load_contest_participants(contest_id: int, config):
+    pool = await init_pool(config)
+    try:
+        # SSCursor streams rows off the wire so a large giveaway never
+        # materializes the full result set next to the participants dict.
+        async with pool.acquire() as conn, conn.cursor(aiomysql.SSCursor) as cursor:
+            await cursor.execute(
+                "SELECT user_json FROM contest_participants WHERE contest_id = %s",
+                (contest_id,)
+            )
+            participants = {}
+            async for row in cursor:
+                u = orjson.loads(row[0])
+                participants[u["id"]] = deserialize_user(u)
+            return participants
+    except Exception as e:
+        logger.error(f"Error loading participants for contest {contest_id}: {e}")
+        return {}
+
+async def load_participants_blob(config):
+    pool = await init_pool(config)
+    try:
+        async with pool.acquire() as conn, conn.cursor() as cursor:
+            await cursor.execute("SELECT participants FROM giveaway_state WHERE id = 1")
+            result = await cursor.fetchone()
+            participants_data = orjson.loads(result[0] or '[]') if result else []
+            return {u["id"]: deserialize_user(u) for u in participants_data}
+    except Exception as e:
+        logger.error(f"Error loading participants blob: {e}")
+        return {}
+
+async def clear_contest_participants(contest_id: int, config):
+    pool = await init_pool(config)
+    try:
+        async with pool.acquire() as conn, conn.cursor() as cursor:
+            await cursor.execute(
+                "DELETE FROM contest_participants WHERE contest_id = %s",
+                (contest_id,)
+            )
+            await conn.commit()
+    except Exception as e:
+        logger.error(f"Error clearing participants for contest {contest_id}: {e}")
+        raise
+
+CLEAR_RUNTIME_STATE_SQL = """
+    UPDATE giveaway_state
+    SET current_contest_id = NULL, giveaway_message_id = NULL,
+        giveaway_chat_id = NULL, giveaway_has_image = FALSE, end_at = NULL
+    WHERE id = 1
+"""
+
+async def clear_giveaway_runtime_state(config):
+    pool = await init_pool(config)
+    try:
+        async with pool.acquire() as conn, conn.cursor() as cursor:
+            await cursor.execute(CLEAR_RUNTIME_STATE_SQL)
+            await conn.commit()
+            logger.info("Cleared giveaway runtime state")
+    except Exception as e:
+        logger.error(f"Error clearing giveaway runtime state: {e}")
+        raise
+
+def _unpack_claimed_winners(raw) -> set:
+    if not raw:
+        return set()
+    if isinstance(raw, str):
+        raw = raw.encode()
+    if raw[:1] == b'[':
+        return set(orjson.loads(raw))
+    return set(struct.unpack(f'<{len(raw) // 8}q', raw))
+
+async def load_state_from_db(config, skip_participants=False):
+    pool = await init_pool(config)
+    try:
+        async with pool.acquire() as conn, conn.cursor() as cursor:
             await cursor.execute("""
-                SELECT participants, winners, claimed_winners, giveaway_message_id, 
-                       giveaway_chat_id, giveaway_has_image, current_contest_id
+                SELECT participants, winners, claimed_winners, giveaway_message_id,
+                       giveaway_chat_id, giveaway_has_image, current_contest_id, end_at
                 FROM giveaway_state WHERE id = 1
             """)
             result = await cursor.fetchone()
-            
+
             if result:
-                participants_data = json.loads(result[0] or '[]')
-                participants = {u["id"]: deserialize_user(u) for u in participants_data}
-                
-                winners = json.loads(result[1] or '{}')
-                claimed_winners = set(json.loads(result[2] or '[]'))
+                if skip_participants:
+                    participants = {}
+                else:
+                    participants_data = orjson.loads(result[0] or '[]')
+                    participants = {u["id"]: deserialize_user(u) for u in participants_data}
+
+                winners = orjson.loads(result[1] or '{}')
+                claimed_winners = _unpack_claimed_winners(result[2])
                 
                 giveaway_message_id = result[3]
                 giveaway_chat_id = result[4]
                 giveaway_has_image = bool(result[5])
                 current_contest_id = result[6]
-                
+                end_at = result[7]
+
                 logger.info("State loaded from database")
-                return participants, winners, claimed_winners, giveaway_message_id, giveaway_chat_id, giveaway_has_image, current_contest_id
+                return participants, winners, claimed_winners, giveaway_message_id, giveaway_chat_id, giveaway_has_image, current_contest_id, end_at
             else:
                 await cursor.execute("""
                     INSERT INTO giveaway_state (id) VALUES (1)
                 """)
                 await conn.commit()
                 logger.info("Created initial state record in database")
-                return {}, {}, set(), None, None, False, None
+                return {}, {}, set(), None, None, False, None, None
     except Exception as e:
         logger.error(f"Error loading state from database: {e}")
-        return {}, {}, set(), None, None, False, None
-    finally:
-        conn.close()
+        return {}, {}, set(), None, None, False, None, None
 
 async def create_contest_prizes(contest_id: int, prizes_list: list, config):
-    conn = await get_db_connection(config)
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
-            for position, prize in enumerate(prizes_list, 1):
-                from giveaway_bot import is_safe_link
-                prize_type = 'link' if is_safe_link(prize) else 'text'
-                
-                await cursor.execute("""
-                    INSERT INTO contest_prizes (contest_id, position, prize_name, prize_type, prize_value)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (contest_id, position, prize, prize_type, prize))
-            
+        from giveaway_bot import is_safe_link
+        rows = [
+            (contest_id, position, prize, 'link' if is_safe_link(prize) else 'text', prize)
+            for position, prize in enumerate(prizes_list, 1)
+        ]
+        async with pool.acquire() as conn, conn.cursor() as cursor:
+            await cursor.executemany("""
+                INSERT INTO contest_prizes (contest_id, position, prize_name, prize_type, prize_value)
+                VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                prize_name = VALUES(prize_name), prize_type = VALUES(prize_type),
+                prize_value = VALUES(prize_value)
+            """, rows)
+
             await conn.commit()
             logger.info(f"Created {len(prizes_list)} contest prizes for contest {contest_id}")
     except Exception as e:
         logger.error(f"Error creating contest prizes: {e}")
         raise
-    finally:
-        conn.close()
 
 async def get_contest_prizes(contest_id: int, config):
-    conn = await get_db_connection(config)
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
+        async with pool.acquire() as conn, conn.cursor(aiomysql.DictCursor) as cursor:
             await cursor.execute("""
-                SELECT position, prize_name, prize_type, prize_value 
+                SELECT position, prize_name, prize_type, prize_value
                 FROM contest_prizes 
                 WHERE contest_id = %s 
                 ORDER BY position
             """, (contest_id,))
             
-            results = await cursor.fetchall()
-            prizes = []
-            for result in results:
-                prizes.append({
-                    'position': result[0],
-                    'prize_name': result[1],
-                    'prize_type': result[2],
-                    'prize_value': result[3]
-                })
-            return prizes
+            return await cursor.fetchall()
     except Exception as e:
         logger.error(f"Error getting contest prizes: {e}")
         raise
-    finally:
-        conn.close()
+
+async def get_contest_with_prizes(contest_id: int, config):
+    pool = await init_pool(config)
+    try:
+        async with pool.acquire() as conn, conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute("""
+                SELECT c.contest_name AS name, c.duration, c.winners_count, c.image_url,
+                       cp.position, cp.prize_name, cp.prize_type, cp.prize_value
+                FROM contests c
+                LEFT JOIN contest_prizes cp ON cp.contest_id = c.id
+                WHERE c.id = %s
+                ORDER BY cp.position
+            """, (contest_id,))
+
+            rows = await cursor.fetchall()
+            if not rows:
+                return None
+            contest = {
+                'name': rows[0]['name'],
+                'duration': rows[0]['duration'],
+                'winners_count': rows[0]['winners_count'],
+                'image_url': rows[0]['image_url'],
+                'prizes_detail': [
+                    {'position': row['position'], 'prize_name': row['prize_name'],
+                     'prize_type': row['prize_type'], 'prize_value': row['prize_value']}
+                    for row in rows if row['position'] is not None
+                ]
+            }
+            return contest
+    except Exception as e:
+        logger.error(f"Error getting contest {contest_id} with prizes: {e}")
+        raise
 
 async def create_prize(name: str, description: str, prize_type: str, prize_data: str, config):
-    conn = await get_db_connection(config)
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
+        async with pool.acquire() as conn, conn.cursor() as cursor:
             await cursor.execute("""
                 INSERT INTO prizes (name, description, prize_type, prize_data)
                 VALUES (%s, %s, %s, %s)
@@ -322,36 +524,47 @@ async def create_prize(name: str, description: str, prize_type: str, prize_data:
     except Exception as e:
         logger.error(f"Error creating prize: {e}")
         raise
-    finally:
-        conn.close()
+
+ASSIGN_WINNERS_SQL = """
+    INSERT INTO prize_claims (contest_id, position, winner_user_id, security_code)
+    VALUES (%s, %s, %s, LOWER(HEX(RANDOM_BYTES(16))))
+    ON DUPLICATE KEY UPDATE winner_user_id = VALUES(winner_user_id)
+"""
+
+async def assign_winners_to_prize_positions(contest_id: int, position_winners: list, config):
+    pool = await init_pool(config)
+    try:
+        rows = [(contest_id, position, user_id) for position, user_id in position_winners]
+        async with pool.acquire() as conn, conn.cursor() as cursor:
+            await cursor.executemany(ASSIGN_WINNERS_SQL, rows)
+            await conn.commit()
+            logger.info(f"Assigned {len(rows)} winners to prize positions in contest {contest_id}")
+    except Exception as e:
+        logger.error(f"Error assigning winners to prizes: {e}")
+        raise
 
 async def assign_winner_to_prize_position(contest_id: int, position: int, user_id: int, prize_id: int, config):
-    import secrets
-    
-    conn = await get_db_connection(config)
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
-            security_code = secrets.token_hex(16)
-            
+        async with pool.acquire() as conn, conn.cursor() as cursor:
             await cursor.execute("""
                 INSERT INTO prize_claims (contest_id, position, winner_user_id, security_code, prize_id)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (contest_id, position, user_id, security_code, prize_id))
+                VALUES (%s, %s, %s, LOWER(HEX(RANDOM_BYTES(16))), %s)
+            """, (contest_id, position, user_id, prize_id))
             
             await conn.commit()
             logger.info(f"Assigned user {user_id} to prize position {position} in contest {contest_id} with prize {prize_id}")
     except Exception as e:
         logger.error(f"Error assigning winner to prize: {e}")
         raise
-    finally:
-        conn.close()
 
 async def get_prize_by_security_code(security_code: str, config):
-    conn = await get_db_connection(config)
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
+        async with pool.acquire() as conn, conn.cursor(aiomysql.DictCursor) as cursor:
             await cursor.execute("""
-                SELECT p.name, p.description, p.prize_type, p.prize_data, 
+                SELECT p.name AS prize_name, p.description AS prize_description,
+                       p.prize_type, p.prize_data,
                        pc.contest_id, pc.position, pc.winner_user_id, pc.claimed_at,
                        c.contest_name, c.group_title
                 FROM prize_claims pc
@@ -359,32 +572,16 @@ async def get_prize_by_security_code(security_code: str, config):
                 LEFT JOIN contests c ON pc.contest_id = c.id
                 WHERE pc.security_code = %s
             """, (security_code,))
-            
-            result = await cursor.fetchone()
-            if result:
-                return {
-                    'prize_name': result[0],
-                    'prize_description': result[1],
-                    'prize_type': result[2],
-                    'prize_data': result[3],
-                    'contest_id': result[4],
-                    'position': result[5],
-                    'winner_user_id': result[6],
-                    'claimed_at': result[7],
-                    'contest_name': result[8],
-                    'group_title': result[9]
-                }
-            return None
+
+            return await cursor.fetchone()
     except Exception as e:
         logger.error(f"Error getting prize by security code: {e}")
         raise
-    finally:
-        conn.close()
 
 async def mark_prize_as_claimed_by_code(security_code: str, config):
-    conn = await get_db_connection(config)
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
+        async with pool.acquire() as conn, conn.cursor() as cursor:
             await cursor.execute("""
                 UPDATE prize_claims 
                 SET claimed_at = CURRENT_TIMESTAMP 
@@ -392,46 +589,34 @@ async def mark_prize_as_claimed_by_code(security_code: str, config):
             """, (security_code,))
             
             await conn.commit()
+            if cursor.rowcount > 0:
+                _claim_cache.clear()
             return cursor.rowcount > 0
     except Exception as e:
         logger.error(f"Error marking prize as claimed: {e}")
         raise
-    finally:
-        conn.close()
 
 async def get_winner_prize_info(contest_id: int, user_id: int, config):
-    conn = await get_db_connection(config)
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
+        async with pool.acquire() as conn, conn.cursor(aiomysql.DictCursor) as cursor:
             await cursor.execute("""
-                SELECT cp.position, cp.prize_name, cp.prize_type, cp.prize_value, 
+                SELECT cp.position, cp.prize_name, cp.prize_type, cp.prize_value,
                        pc.claimed_at, pc.security_code
                 FROM contest_prizes cp
                 JOIN prize_claims pc ON cp.contest_id = pc.contest_id AND cp.position = pc.position
                 WHERE cp.contest_id = %s AND pc.winner_user_id = %s
             """, (contest_id, user_id))
-            
-            result = await cursor.fetchone()
-            if result:
-                return {
-                    'position': result[0],
-                    'prize_name': result[1],
-                    'prize_type': result[2],
-                    'prize_value': result[3],
-                    'claimed_at': result[4],
-                    'security_code': result[5]
-                }
-            return None
+
+            return await cursor.fetchone()
     except Exception as e:
         logger.error(f"Error getting winner prize info: {e}")
         raise
-    finally:
-        conn.close()
 
 async def mark_prize_as_claimed(contest_id: int, user_id: int, config):
-    conn = await get_db_connection(config)
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
+        async with pool.acquire() as conn, conn.cursor() as cursor:
             await cursor.execute("""
                 UPDATE prize_claims 
                 SET claimed_at = NOW() 
@@ -443,68 +628,56 @@ async def mark_prize_as_claimed(contest_id: int, user_id: int, config):
                 return False
                 
             await conn.commit()
+            _claim_cache.clear()
             logger.info(f"Marked prize as claimed for user {user_id} in contest {contest_id}")
             return True
     except Exception as e:
         logger.error(f"Error marking prize as claimed: {e}")
         raise
-    finally:
-        conn.close()
 
 async def get_latest_unclaimed_prize_for_user(user_id: int, config):
-    conn = await get_db_connection(config)
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute("""
-                SELECT cp.contest_id, cp.position, cp.prize_name, cp.prize_type, cp.prize_value, 
-                       pc.security_code
-                FROM contest_prizes cp
-                JOIN prize_claims pc ON cp.contest_id = pc.contest_id AND cp.position = pc.position
-                WHERE pc.winner_user_id = %s AND pc.claimed_at IS NULL
-                ORDER BY pc.contest_id DESC, cp.position ASC
-                LIMIT 1
-            """, (user_id,))
-            
-            result = await cursor.fetchone()
-            if result:
-                return {
-                    'contest_id': result[0],
-                    'position': result[1],
-                    'prize_name': result[2],
-                    'prize_type': result[3],
-                    'prize_value': result[4],
-                    'security_code': result[5]
-                }
-            return None
+        async with pool.acquire() as conn, conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(LATEST_UNCLAIMED_PRIZE_SQL, (user_id,))
+
+            return await cursor.fetchone()
     except Exception as e:
         logger.error(f"Error getting latest unclaimed prize for user {user_id}: {e}")
         raise
-    finally:
-        conn.close()
+
+# Short-lived cache so bursts of repeated claim checks for the same prize
+# don't each hit the database. The UNIQUE KEY on prize_claims remains the
+# correctness guarantee; this only shields read latency.
+_claim_cache = {}
+CLAIM_CACHE_TTL = 5
 
 async def is_prize_claimed(contest_id: int, position: int, config):
-    conn = await get_db_connection(config)
+    key = (contest_id, position)
+    cached = _claim_cache.get(key)
+    now = time.monotonic()
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute("""
-                SELECT claimed_at FROM prize_claims 
-                WHERE contest_id = %s AND position = %s
-            """, (contest_id, position))
-            
+        async with pool.acquire() as conn, conn.cursor() as cursor:
+            await cursor.execute(IS_PRIZE_CLAIMED_SQL, (contest_id, position))
+
             result = await cursor.fetchone()
-            return result and result[0] is not None
+            claimed = bool(result and result[0] is not None)
+            _claim_cache[key] = (claimed, now + CLAIM_CACHE_TTL)
+            return claimed
     except Exception as e:
         logger.error(f"Error checking if prize is claimed: {e}")
         return False
-    finally:
-        conn.close()
 
 async def get_active_contests(config):
-    conn = await get_db_connection(config)
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
+        async with pool.acquire() as conn, conn.cursor(aiomysql.DictCursor) as cursor:
             await cursor.execute("""
-                SELECT DISTINCT c.id, c.contest_name, c.duration, c.winners_count, c.prizes, c.image_url
+                SELECT DISTINCT c.id, c.contest_name AS name, c.duration, c.winners_count, c.prizes, c.image_url
                 FROM contests c
                 JOIN giveaway_state gs ON c.id = gs.current_contest_id
                 WHERE gs.current_contest_id IS NOT NULL
@@ -512,30 +685,20 @@ async def get_active_contests(config):
                 AND (gs.winners IS NULL OR JSON_LENGTH(gs.winners) = 0)
             """)
             
-            results = await cursor.fetchall()
-            active_contests = []
-            for row in results:
-                active_contests.append({
-                    'id': row[0],
-                    'name': row[1],
-                    'duration': row[2],
-                    'winners_count': row[3],
-                    'prizes': row[4].split(',') if row[4] else [],
-                    'image_url': row[5]
-                })
+            active_contests = await cursor.fetchall()
+            for contest in active_contests:
+                contest['prizes'] = contest['prizes'].split(',') if contest['prizes'] else []
             return active_contests
     except Exception as e:
         logger.error(f"Error getting active contests: {e}")
         return []
-    finally:
-        conn.close()
 
 async def get_user_rewards(user_id: int, config):
-    conn = await get_db_connection(config)
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
+        async with pool.acquire() as conn, conn.cursor(aiomysql.DictCursor) as cursor:
             await cursor.execute("""
-                SELECT 
+                SELECT
                     c.contest_name,
                     cp.prize_name,
                     cp.position,
@@ -547,26 +710,15 @@ async def get_user_rewards(user_id: int, config):
                 ORDER BY pc.contest_id DESC, cp.position ASC
             """, (user_id,))
             
-            results = await cursor.fetchall()
-            rewards = []
-            for row in results:
-                rewards.append({
-                    'contest_name': row[0],
-                    'prize_name': row[1],
-                    'position': row[2],
-                    'claimed_at': row[3]
-                })
-            return rewards
+            return await cursor.fetchall()
     except Exception as e:
         logger.error(f"Error getting user rewards: {e}")
         return []
-    finally:
-        conn.close()
 
 async def cleanup_old_contests(config):
-    conn = await get_db_connection(config)
+    pool = await init_pool(config)
     try:
-        async with conn.cursor() as cursor:
+        async with pool.acquire() as conn, conn.cursor() as cursor:
             await cursor.execute("""
                 DELETE FROM contests 
                 WHERE created_at < NOW() - INTERVAL 90 DAY
@@ -580,5 +732,3 @@ async def cleanup_old_contests(config):
     except Exception as e:
         logger.error(f"Error cleaning up old contests: {e}")
         return 0
-    finally:
-        conn.close()
@@ -1,20 +1,38 @@
 #! /usr/bin/env python3
 
 import asyncio
+import functools
+import heapq
+import itertools
 import secrets
 import shlex
-import json
+import struct
+import time
+import orjson
 import os
 import aiohttp
+import aiomysql
 import logging
+import queue
 import re
-from aiogram import Bot, Dispatcher, types
+from logging.handlers import QueueHandler, QueueListener
+from aiogram import BaseMiddleware, Bot, Dispatcher, types
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import SendMessage
 from aiogram.filters import Command
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.types import BufferedInputFile
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import pytz
+from db import (init_pool, init_database, save_state_to_db as db_save_state,
+                load_state_from_db as db_load_state, load_contest_participants,
+                load_participants_blob, add_contest_participant,
+                clear_contest_participants, clear_giveaway_runtime_state,
+                create_contest_prizes, assign_winners_to_prize_positions,
+                get_latest_unclaimed_prize_for_user, mark_prize_as_claimed,
+                get_contest_with_prizes, get_user_rewards, get_active_contests,
+                create_prize, cleanup_old_contests)
 
 DAYS_MUST_BE_POSITIVE = "Days must be a positive number"
 HOURS_MUST_BE_POSITIVE = "Hours must be a positive number"
@@ -25,7 +43,6 @@ HOURS_CANNOT_EXCEED_8760 = "Hours cannot exceed 8760 (365 days)"
 MINUTES_CANNOT_EXCEED_1440 = "Minutes cannot exceed 1440 (24 hours)"
 MONTHS_CANNOT_EXCEED_12 = "Months cannot exceed 12"
 TOTAL_DURATION_CANNOT_EXCEED_365_DAYS = "Total duration cannot exceed 365 days"
-ERROR_CHECKING_ADMIN_STATUS = "Error checking admin status."
 CHAT_NOT_AUTHORIZED = "This chat is not authorized for giveaways."
 NOBODY_JOINED_GIVEAWAY = "😿 Oh no, nobody joined the giveaway…"
 USAGE_CREATE_CONTEST = (
@@ -55,14 +72,20 @@ try:
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     
-    handlers = [main_handler, error_handler, console_handler]
+    sink_handlers = [main_handler, error_handler, console_handler]
 except OSError:
-    handlers = [logging.StreamHandler()]
+    sink_handlers = [logging.StreamHandler()]
+
+# Records are enqueued from the event loop and written by the listener
+# thread, so file/console I/O never blocks a handler coroutine.
+_log_queue = queue.Queue(-1)
+_log_listener = QueueListener(_log_queue, *sink_handlers, respect_handler_level=True)
+_log_listener.start()
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=handlers
+    handlers=[QueueHandler(_log_queue)]
 )
 logger = logging.getLogger(__name__)
 
@@ -84,28 +107,45 @@ DB_CONFIG = {
 }
 
 allowed_chats_str = os.getenv("ALLOWED_CHATS", "")
-ALLOWED_CHATS = [int(chat_id.strip()) for chat_id in allowed_chats_str.split(",") if chat_id.strip()]
+ALLOWED_CHATS = frozenset(int(chat_id.strip()) for chat_id in allowed_chats_str.split(",") if chat_id.strip())
 
 admin_id_str = os.getenv("ADMIN_ID", "")
 ADMIN_ID = int(admin_id_str) if admin_id_str.strip() else None
 
+# pytz.timezone re-parses the Olson rules on every call; the bot only
+# ever formats in this one zone.
+_TALLINN_TZ = pytz.timezone('Europe/Tallinn')
+
 ALLOWED_DOMAINS = ["t.me", "telegram.me", "coonlink.com", "github.com", "steamcommunity.com"]
-participants_lock = asyncio.Lock()  
+participants_lock = asyncio.Lock()
+
+# One OS-entropy RNG for all winner draws; constructing SystemRandom per
+# draw bought nothing since it keeps no reusable state between calls.
+_SYSTEM_RANDOM = secrets.SystemRandom()
 
-bot = Bot(token=TOKEN)
+def _orjson_dumps(obj) -> str:
+    return orjson.dumps(obj).decode()
+
+# Every outgoing API call and incoming update goes through the session's
+# JSON codec; orjson encodes/decodes these small dicts several times
+# faster than the stdlib default.
+bot = Bot(token=TOKEN, session=AiohttpSession(json_loads=orjson.loads, json_dumps=_orjson_dumps))
 dp = Dispatcher()
 
-participants = {}  
+participant_ids = set()
+participants_cache = {}
+participants_list = []
 winners = {}      
 claimed_winners = set() 
 current_contest_id = None 
 giveaway_message_id = None
 giveaway_chat_id = None
 giveaway_has_image = False
-giveaway_task = None  
-state_monitor_task = None  
-cleanup_task = None  
-restore_tasks = []  
+giveaway_end_at = None
+state_monitor_task = None
+cleanup_task = None
+state_flusher_task = None
+giveaway_scheduler_task = None
 
 def serialize_user(user: types.User) -> dict:
     return {
@@ -120,11 +160,31 @@ def serialize_user(user: types.User) -> dict:
 def deserialize_user(data: dict) -> types.User:
     return types.User(**{k: v for k, v in data.items() if v is not None})
 
+def add_participant(user: types.User) -> bool:
+    """Record a participant; returns False if they had already joined.
+
+    setdefault makes the duplicate check and the insert one hash lookup
+    on the cache dict instead of a membership test plus a store.
+    """
+    blob = orjson.dumps(serialize_user(user))
+    if participants_cache.setdefault(user.id, blob) is not blob:
+        return False
+    participant_ids.add(user.id)
+    participants_list.append(user.id)
+    return True
+
+_SANITIZE_RE = re.compile(r'[^\w\s,.()-]')
+_DATA_RES = [re.compile(p) for p in (
+    r'^[A-Za-z0-9]{8,}$',
+    r'^[0-9]{4,}$',
+    r'^[A-Za-z0-9+/]{20,}$',
+    r'^[a-f0-9]{32,}$',
+)]
+
 def sanitize_string(s: str) -> str:
     if not s:
         return ""
-    s = re.sub(r'[^\w\s,.()-]', '', s)  
-    return s[:255]  
+    return _SANITIZE_RE.sub('', s)[:255]
 
 def _parse_time_format(duration_str: str) -> int:
     parts = duration_str.split(':')
@@ -139,8 +199,7 @@ def _parse_time_format(duration_str: str) -> int:
     if minutes < 0 or minutes > 59:
         raise ValueError("Minutes must be between 0 and 59")
     
-    tallinn_tz = pytz.timezone('Europe/Tallinn')
-    now = datetime.now(tallinn_tz)
+    now = datetime.now(_TALLINN_TZ)
     target_time = now.replace(hour=hours, minute=minutes, second=0, microsecond=0)
     
     if target_time <= now:
@@ -196,51 +255,26 @@ def _parse_combined_format(duration_str: str) -> int:
     
     return total_seconds
 
-def _parse_days_text(duration_str: str) -> int:
-    days = int(''.join(filter(str.isdigit, duration_str)))
-    if days <= 0:
-        raise ValueError(DAYS_MUST_BE_POSITIVE)
-    if days > 365:
-        raise ValueError(DAYS_CANNOT_EXCEED_365)
-    return days * 24 * 3600
+_DUR_DIGITS_RE = re.compile(r'\d+')
 
-def _parse_minutes_text(duration_str: str) -> int:
-    minutes = int(''.join(filter(str.isdigit, duration_str)))
-    if minutes <= 0:
-        raise ValueError(MINUTES_MUST_BE_POSITIVE)
-    if minutes > 1440:
-        raise ValueError(MINUTES_CANNOT_EXCEED_1440)
-    return minutes * 60
-
-def _parse_hours_text(duration_str: str) -> int:
-    hours = int(''.join(filter(str.isdigit, duration_str)))
-    if hours <= 0:
-        raise ValueError(HOURS_MUST_BE_POSITIVE)
-    if hours > 8760:
-        raise ValueError(HOURS_CANNOT_EXCEED_8760)
-    return hours * 3600
-
-def _parse_months_text(duration_str: str) -> int:
-    months = int(''.join(filter(str.isdigit, duration_str)))
-    if months <= 0:
-        raise ValueError(MONTHS_MUST_BE_POSITIVE)
-    if months > 12:
-        raise ValueError(MONTHS_CANNOT_EXCEED_12)
-    return months * 30 * 24 * 3600
+# (unit substring, seconds per unit, max units, positive error, limit error)
+# Checked in order; the input is lowercased before it gets here.
+_TEXT_UNIT_TABLE = (
+    ('day', 24 * 3600, 365, DAYS_MUST_BE_POSITIVE, DAYS_CANNOT_EXCEED_365),
+    ('minute', 60, 1440, MINUTES_MUST_BE_POSITIVE, MINUTES_CANNOT_EXCEED_1440),
+    ('hour', 3600, 8760, HOURS_MUST_BE_POSITIVE, HOURS_CANNOT_EXCEED_8760),
+    ('month', 30 * 24 * 3600, 12, MONTHS_MUST_BE_POSITIVE, MONTHS_CANNOT_EXCEED_12),
+)
 
 def _parse_text_format(duration_str: str) -> int | None:
-    if 'DAY' in duration_str or 'day' in duration_str:
-        return _parse_days_text(duration_str)
-    
-    if 'MIN' in duration_str or 'minute' in duration_str:
-        return _parse_minutes_text(duration_str)
-    
-    if 'HOUR' in duration_str or 'hour' in duration_str:
-        return _parse_hours_text(duration_str)
-    
-    if 'MONTH' in duration_str or 'month' in duration_str:
-        return _parse_months_text(duration_str)
-    
+    for unit, unit_seconds, limit, positive_error, limit_error in _TEXT_UNIT_TABLE:
+        if unit in duration_str:
+            value = int(''.join(_DUR_DIGITS_RE.findall(duration_str)))
+            if value <= 0:
+                raise ValueError(positive_error)
+            if value > limit:
+                raise ValueError(limit_error)
+            return value * unit_seconds
     return None
 
 def parse_duration_input(duration_str: str) -> int:
@@ -268,21 +302,20 @@ def parse_duration_input(duration_str: str) -> int:
     except ValueError as e:
         raise ValueError(f"Invalid duration format: {duration_str}. {str(e)}")
 
+# (upper bound in seconds or None for open-ended, divisor, unit label)
+_FMT_THRESHOLDS = (
+    (60, 1, "seconds"),
+    (3600, 60, "minutes"),
+    (86400, 3600, "hours"),
+    (2592000, 86400, "days"),
+    (None, 30 * 86400, "months"),
+)
+
+@functools.lru_cache(maxsize=64)
 def format_duration(duration_seconds: int) -> str:
-    if duration_seconds < 60:
-        return f"{duration_seconds} seconds"
-    elif duration_seconds < 3600:
-        minutes = duration_seconds // 60
-        return f"{minutes} minutes"
-    elif duration_seconds < 86400:
-        hours = duration_seconds // 3600
-        return f"{hours} hours"
-    elif duration_seconds < 2592000:  
-        days = duration_seconds // 86400
-        return f"{days} days"
-    else:
-        months = duration_seconds // (30 * 86400)
-        return f"{months} months"
+    for upper, divisor, label in _FMT_THRESHOLDS:
+        if upper is None or duration_seconds < upper:
+            return f"{duration_seconds // divisor} {label}"
 
 def is_safe_link(link: str) -> bool:
     if not link:
@@ -306,7 +339,7 @@ def validate_prize_link(link: str) -> bool:
         return False
 
 def is_duplicate_participant(user_id: int) -> bool:
-    return user_id in participants
+    return user_id in participant_ids
 
 async def safe_edit_message(func, *args, **kwargs):
     max_retries = 3
@@ -319,7 +352,6 @@ async def safe_edit_message(func, *args, **kwargs):
             error_msg = str(e).lower()
 
             if "retry after" in error_msg:
-                import re
                 retry_match = re.search(r'retry after (\d+)', error_msg)
                 if retry_match:
                     retry_delay = int(retry_match.group(1))
@@ -360,14 +392,9 @@ def _ordinal_suffix(n: int) -> str:
     return f"{n}{suffix}"
 
 def is_data(text: str) -> bool:
-    data_patterns = [
-        r'^[A-Za-z0-9]{8,}$',  
-        r'^[0-9]{4,}$',         
-        r'^[A-Za-z0-9+/]{20,}$', 
-        r'^[a-f0-9]{32,}$',     
-    ]
-    for pattern in data_patterns:
-        if re.match(pattern, text.strip()):
+    text = text.strip()
+    for pattern in _DATA_RES:
+        if pattern.match(text):
             return True
     return False
 
@@ -381,9 +408,7 @@ def validate_contest_params(duration: int, winners_count: int, prizes: list) ->
     return True, ""
 
 def is_giveaway_running() -> bool:
-    is_running = current_contest_id is not None
-    logger.debug(f"Giveaway running check: {is_running} (contest_id: {current_contest_id})")
-    return is_running
+    return current_contest_id is not None
 
 def validate_config():
     errors = []
@@ -411,98 +436,82 @@ def validate_config():
     
     logger.info("Configuration validation passed")
 
+POS_EMOJI = ("🥇", "🥈", "🥉")
+
+def _position_emoji(position: int, overflow: str = "🏅") -> str:
+    return POS_EMOJI[position - 1] if 1 <= position <= 3 else overflow
+
+# The join/claim keyboards never vary, so build (and serialize) them once
+# at import instead of re-running InlineKeyboardBuilder per giveaway.
+_b = InlineKeyboardBuilder()
+_b.button(text="🎁 Join", callback_data="join")
+JOIN_MARKUP = _b.as_markup()
+
+_b = InlineKeyboardBuilder()
+_b.button(text="🎁 Claim Prize", callback_data="claim")
+CLAIM_MARKUP = _b.as_markup()
+del _b
+
 def create_giveaway_start_message(contest_name: str, duration: int, winners_count: int, prizes: list) -> str:
-    tallinn_tz = pytz.timezone('Europe/Tallinn')
-    now = datetime.now(tallinn_tz)
+    now = datetime.now(_TALLINN_TZ)
     end_time = now + timedelta(seconds=duration)
-    
+
     end_str = end_time.strftime("%B %d, %H:%M")
     time_info = f"{end_str} (Europe/Tallinn)"
-     
+
     valid_prizes = [prize.strip() for prize in prizes if prize and prize.strip()]
-    
-    message = f"🎂 {contest_name} Giveaway Started!\n\n"
-    message += f"⏰ Ends: {time_info}\n\n"
-    
+
+    parts = [f"🎂 {contest_name} Giveaway Started!\n\n",
+             f"⏰ Ends: {time_info}\n\n"]
+
     if valid_prizes:
-        message += "🎁 Prizes:\n"
+        parts.append("🎁 Prizes:\n")
         for i, prize in enumerate(valid_prizes, 1):
-            if i == 1:
-                position_emoji = "🥇"
-            elif i == 2:
-                position_emoji = "🥈"
-            elif i == 3:
-                position_emoji = "🥉"
-            else:
-                position_emoji = "🏅"
-            message += f"{position_emoji} {prize}\n"
+            position_emoji = _position_emoji(i)
+            parts.append(f"{position_emoji} {prize}\n")
     else:
-        message += "🎁 Prizes: 🎁 Mystery Prize\n"
-    
-    message += f"\n 🏆 Winners: {winners_count}\n\n"
-    message += "📌 How to participate:\n"
-    message += "(｡･ω･｡) Tap the \"🎁 Join\" button, sweetie!\n"
-    message += "(*≧ω≦) Sit tight until the giveaway ends!\n"
-    message += "(✿◠‿◠) Winners will be announced and can collect their prize!\n\n"
-    message += "Good luck, lovebirds! ✿♥‿♥✿"
-    
-    return message
+        parts.append("🎁 Prizes: 🎁 Mystery Prize\n")
+
+    parts.append(f"\n 🏆 Winners: {winners_count}\n\n")
+    parts.append("📌 How to participate:\n")
+    parts.append("(｡･ω･｡) Tap the \"🎁 Join\" button, sweetie!\n")
+    parts.append("(*≧ω≦) Sit tight until the giveaway ends!\n")
+    parts.append("(✿◠‿◠) Winners will be announced and can collect their prize!\n\n")
+    parts.append("Good luck, lovebirds! ✿♥‿♥✿")
+
+    return ''.join(parts)
+
+async def get_db_pool():
+    return await init_pool(DB_CONFIG)
+
+# Contest rows are effectively immutable between admin edits, so command
+# handlers read them through a short TTL cache instead of paying a DB
+# round-trip per /stats or /start_giveaway.
+_CONTEST_CACHE = {}
+CONTEST_CACHE_TTL = 30
+
+def _invalidate_contest_cache(contest_id=None):
+    global _contest_listing_cache
+    if contest_id is None:
+        _CONTEST_CACHE.clear()
+    else:
+        _CONTEST_CACHE.pop(contest_id, None)
+    _contest_listing_cache = None
 
-async def get_db_connection(max_retries=3, retry_delay=5):
-    import aiomysql
-    for attempt in range(max_retries):
-        try:
-            logger.info(f"Attempting database connection (attempt {attempt + 1}/{max_retries})")
-            conn = await aiomysql.connect(**DB_CONFIG)
-            logger.info("Database connection established successfully")
-            return conn
-        except aiomysql.Error as e:
-            logger.error(f"Database connection failed (attempt {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                logger.info(f"Retrying in {retry_delay} seconds...")
-                await asyncio.sleep(retry_delay)
-            else:
-                logger.critical("Failed to connect to database after all retries")
-                raise ConnectionError("Failed to connect to database after retries")
+async def get_contest_cached(contest_id: int):
+    now = time.monotonic()
+    cached = _CONTEST_CACHE.get(contest_id)
+    if cached is not None and cached[1] > now:
+        return cached[0]
 
-async def init_database():
-    conn = await get_db_connection()
-    try:
-        async with conn.cursor() as cursor:
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS contests (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    contest_name VARCHAR(255) NOT NULL,
-                    duration INT NOT NULL,
-                    winners_count INT NOT NULL,
-                    prizes TEXT NOT NULL,
-                    image_url VARCHAR(500),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS giveaway_state (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    participants TEXT,
-                    winners TEXT,
-                    claimed_winners TEXT,
-                    giveaway_message_id BIGINT,
-                    giveaway_chat_id BIGINT,
-                    giveaway_has_image BOOLEAN DEFAULT FALSE,
-                    current_contest_id INT,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-                )
-            """)
-            await conn.commit()
-    finally:
-        conn.close()
+    contest = await get_contest_by_id(contest_id)
+    _CONTEST_CACHE[contest_id] = (contest, now + CONTEST_CACHE_TTL)
+    return contest
 
 async def get_contest_by_id(contest_id: int):
-    conn = await get_db_connection()
+    pool = await get_db_pool()
     try:
-        async with conn.cursor() as cursor:
+        async with pool.acquire() as conn, conn.cursor() as cursor:
             await cursor.execute(
                 "SELECT contest_name, duration, winners_count, prizes, image_url, group_title, group_url FROM contests WHERE id = %s",
                 (contest_id,)
@@ -514,25 +523,21 @@ async def get_contest_by_id(contest_id: int):
                     'duration': result[1],
                     'winners_count': result[2],
                     'prizes': result[3].split(',') if result[3] else [],
+                    # joined once here so per-command formatting (/stats)
+                    # doesn't redo it; cached along with the row.
+                    'prizes_joined': ', '.join(result[3].split(',')) if result[3] else '',
                     'image_url': result[4],
                     'group_title': result[5],
                     'group_url': result[6]
                 }
-                is_valid, error_msg = validate_contest_params(
-                    contest['duration'], 
-                    contest['winners_count'], 
-                    contest['prizes']
-                )
-                if not is_valid:
-                    logger.error(f"Invalid contest {contest_id}: {error_msg}")
-                    raise ValueError(f"Invalid contest parameters: {error_msg}")
+                # Rows are validated in add_contest before insert; the
+                # read path trusts them rather than re-checking (and
+                # raising) on every fetch.
                 return contest
             return None
     except Exception as e:
         logger.error(f"Error getting contest {contest_id}: {e}")
         raise
-    finally:
-        conn.close()
 
 async def add_contest(contest_name: str, duration: int, winners_count: int, prizes: list, image_url: str = None, group_title: str = None, group_url: str = None):
     contest_name = sanitize_string(contest_name)
@@ -543,9 +548,9 @@ async def add_contest(contest_name: str, duration: int, winners_count: int, priz
     if not is_valid:
         raise ValueError(error_msg)
     
-    conn = await get_db_connection()
+    pool = await get_db_pool()
     try:
-        async with conn.cursor() as cursor:
+        async with pool.acquire() as conn, conn.cursor() as cursor:
             await cursor.execute(
                 "INSERT INTO contests (contest_name, duration, winners_count, prizes, image_url, group_title, group_url) VALUES (%s, %s, %s, %s, %s, %s, %s)",
                 (contest_name, duration, winners_count, ','.join(prizes), image_url, group_title, group_url)
@@ -553,48 +558,108 @@ async def add_contest(contest_name: str, duration: int, winners_count: int, priz
             await conn.commit()
             contest_id = cursor.lastrowid
             logger.info(f"Created contest {contest_id}: {contest_name}")
-            
-            from db import create_contest_prizes
-            await create_contest_prizes(contest_id, prizes, DB_CONFIG)
-            
-            return contest_id
+
+        await create_contest_prizes(contest_id, prizes, DB_CONFIG)
+
+        return contest_id
     except Exception as e:
         logger.error(f"Error creating contest: {e}")
         raise
-    finally:
-        conn.close()
 
-async def list_contests():
-    conn = await get_db_connection()
-    try:
-        async with conn.cursor() as cursor:
-            await cursor.execute("SELECT id, contest_name, duration, winners_count FROM contests ORDER BY id")
-            results = await cursor.fetchall()
-            contests = []
-            for row in results:
-                contests.append({
-                    'id': row[0],
-                    'name': row[1],
-                    'duration': row[2],
-                    'winners_count': row[3]
-                })
-            return contests
-    finally:
-        conn.close()
+async def iter_contests():
+    pool = await get_db_pool()
+    async with pool.acquire() as conn, conn.cursor(aiomysql.SSCursor) as cursor:
+        await cursor.execute("SELECT id, contest_name, duration, winners_count FROM contests ORDER BY id")
+        async for row in cursor:
+            yield row
+
+# The no-argument /start_giveaway listing is the same query and the same
+# text for everyone, so keep the rendered reply for a short TTL. None is
+# cached too (no contests yet). Invalidated alongside the row cache.
+_contest_listing_cache = None
+
+async def get_contest_listing() -> str | None:
+    global _contest_listing_cache
+    now = time.monotonic()
+    if _contest_listing_cache is not None and _contest_listing_cache[0] > now:
+        return _contest_listing_cache[1]
+
+    lines = [f"ID {r[0]}: {r[1]} ({r[2]}s, {r[3]} winners)\n" async for r in iter_contests()]
+    text = "Available contests:\n" + "".join(lines) if lines else None
+    _contest_listing_cache = (now + CONTEST_CACHE_TTL, text)
+    return text
+
+# Deferred full-state saves: handlers that only need eventual durability
+# set the dirty flag and the flusher coalesces bursts into at most one
+# snapshot write per second. end_giveaway/cancel still await the save
+# directly where durability matters.
+_save_dirty = asyncio.Event()
+
+def schedule_state_save():
+    _save_dirty.set()
+
+async def _state_flusher():
+    while True:
+        await _save_dirty.wait()
+        _save_dirty.clear()
+        try:
+            await save_state_to_db()
+        except Exception as e:
+            logger.error(f"Deferred state save failed: {e}")
+        await asyncio.sleep(1.0)
+
+# winners and claimed_winners change a handful of times per giveaway while
+# participants change on every join, so their encoded forms are memoized
+# and only rebuilt after a mutation site calls _invalidate_state_blobs().
+_state_blobs = {}
+
+def _invalidate_state_blobs():
+    _state_blobs.clear()
 
 async def save_state_to_db():
-    from db import save_state_to_db as db_save_state
-    await db_save_state(participants, winners, claimed_winners, giveaway_message_id, 
-                       giveaway_chat_id, giveaway_has_image, current_contest_id, DB_CONFIG)
+    participants_json = (b'[' + b','.join(participants_cache.values()) + b']').decode()
+
+    winners_json = _state_blobs.get('winners')
+    if winners_json is None:
+        # winners is keyed by int user ids; orjson rejects non-string
+        # keys unless told otherwise.
+        winners_json = orjson.dumps(winners, option=orjson.OPT_NON_STR_KEYS).decode()
+        _state_blobs['winners'] = winners_json
+
+    claimed_blob = _state_blobs.get('claimed')
+    if claimed_blob is None:
+        claimed_blob = struct.pack(f'<{len(claimed_winners)}q', *claimed_winners)
+        _state_blobs['claimed'] = claimed_blob
+
+    await db_save_state(None, winners, claimed_winners, giveaway_message_id,
+                       giveaway_chat_id, giveaway_has_image, current_contest_id, DB_CONFIG,
+                       participants_json=participants_json, winners_json=winners_json,
+                       claimed_winners_blob=claimed_blob, end_at=giveaway_end_at)
 
 async def load_state_from_db():
-    global participants, winners, claimed_winners
-    global giveaway_message_id, giveaway_chat_id, giveaway_has_image, current_contest_id
-    
-    from db import load_state_from_db as db_load_state
-    participants, winners, claimed_winners, giveaway_message_id, giveaway_chat_id, giveaway_has_image, current_contest_id = await db_load_state(DB_CONFIG)
-    
-    logger.info(f"Restored state: contest_id={current_contest_id}, participants={len(participants)}, winners={len(winners)}")
+    global winners, claimed_winners
+    global giveaway_message_id, giveaway_chat_id, giveaway_has_image, current_contest_id, giveaway_end_at
+
+    restored, winners, claimed_winners, giveaway_message_id, giveaway_chat_id, giveaway_has_image, current_contest_id, giveaway_end_at = await db_load_state(DB_CONFIG, skip_participants=True)
+
+    if current_contest_id is not None:
+        # The contest_participants table is the authoritative join record;
+        # the JSON snapshot is only consulted for states written before the
+        # table existed.
+        restored = await load_contest_participants(current_contest_id, DB_CONFIG)
+        if not restored:
+            restored = await load_participants_blob(DB_CONFIG)
+
+    participant_ids.clear()
+    participants_cache.clear()
+    del participants_list[:]
+    for user_id, user in restored.items():
+        participant_ids.add(user_id)
+        participants_cache[user_id] = orjson.dumps(serialize_user(user))
+        participants_list.append(user_id)
+    _invalidate_state_blobs()
+    
+    logger.info(f"Restored state: contest_id={current_contest_id}, participants={len(participant_ids)}, winners={len(winners)}")
 
 async def state_monitor():
     while True:
@@ -605,8 +670,9 @@ async def state_monitor():
         except Exception as e:
             logger.error(f"⚠️ DB reconnect failed: {e}")
             try:
-                from db import get_db_connection
-                await get_db_connection(DB_CONFIG)
+                pool = await get_db_pool()
+                async with pool.acquire() as conn:
+                    await conn.ping()
                 logger.info("✅ DB reconnected successfully")
             except Exception as reconnect_error:
                 logger.error(f"❌ DB reconnection failed: {reconnect_error}")
@@ -615,7 +681,6 @@ async def auto_cleanup():
     while True:
         try:
             await asyncio.sleep(86400)  
-            from db import cleanup_old_contests
             deleted_count = await cleanup_old_contests(DB_CONFIG)
             giveaway_logger.info(f"🧹 Daily cleanup completed: {deleted_count} old contests removed")
         except Exception as e:
@@ -626,7 +691,7 @@ async def join_callback(callback: types.CallbackQuery):
     user = callback.from_user
 
     if callback.message.chat.id not in ALLOWED_CHATS:
-        await callback.answer("This chat is not authorized for giveaways.", show_alert=True)
+        await callback.answer(CHAT_NOT_AUTHORIZED, show_alert=True)
         return
 
     if user.is_bot:
@@ -634,91 +699,135 @@ async def join_callback(callback: types.CallbackQuery):
         return
 
     async with participants_lock:
-        if is_duplicate_participant(user.id):
+        # A Join click can race the end/cancel of a giveaway; without a
+        # contest there is no row to attach the participant to.
+        if current_contest_id is None:
+            await callback.answer("😿 The giveaway has already ended…", show_alert=True)
+            return
+
+        if not add_participant(user):
             await callback.answer("😉 You are already participating!")
             return
-        
-        participants[user.id] = user
+
         await callback.answer("🎉 You have joined the giveaway! Wait for the results 🧸")
-        await save_state_to_db()
+        await add_contest_participant(current_contest_id, user.id,
+                                      participants_cache[user.id].decode(), DB_CONFIG)
 
 
-async def end_giveaway(duration: int, winners_count: int, prizes: list[str]):
-    global current_contest_id, giveaway_message_id, giveaway_chat_id, giveaway_has_image
-    
+async def _edit_giveaway_message(text: str, reply_markup=None, parse_mode=None):
+    if giveaway_has_image:
+        MAX_CAPTION = 1024
+        caption = text if len(text) <= MAX_CAPTION else (text[:MAX_CAPTION - 1] + "…")
+        try:
+            result = await bot.edit_message_caption(
+                chat_id=giveaway_chat_id,
+                message_id=giveaway_message_id,
+                caption=caption,
+                reply_markup=reply_markup,
+                parse_mode=parse_mode
+            )
+            logger.info("Successfully updated giveaway message (image)")
+            return result
+        except Exception as e:
+            logger.warning(f"Failed to edit caption, falling back to text edit: {e}")
     try:
-        
-        await asyncio.sleep(duration)
-        if not participants:
-            if giveaway_has_image:
-                try:
-                    await bot.edit_message_caption(
-                        chat_id=giveaway_chat_id,
-                        message_id=giveaway_message_id,
-                        caption=NOBODY_JOINED_GIVEAWAY
-                    )
-                    logger.info(f"Successfully updated giveaway message - no participants (image)")
-                except Exception as e:
-                    logger.warning(f"Failed to edit caption for no participants, falling back to text edit: {e}")
-                    try:
-                        await bot.edit_message_text(
-                            chat_id=giveaway_chat_id,
-                            message_id=giveaway_message_id,
-                            text=NOBODY_JOINED_GIVEAWAY
-                        )
-                        logger.info(f"Successfully updated giveaway message - no participants (text fallback)")
-                    except Exception as e2:
-                        logger.error(f"Failed to update giveaway message for no participants: {e2}")
+        result = await bot.edit_message_text(
+            chat_id=giveaway_chat_id,
+            message_id=giveaway_message_id,
+            text=text,
+            reply_markup=reply_markup,
+            parse_mode=parse_mode
+        )
+        logger.info("Successfully updated giveaway message")
+        return result
+    except Exception as e:
+        logger.error(f"Failed to update giveaway message: {e}")
+        return None
+
+# One scheduler task owns all pending end-of-giveaway deadlines instead
+# of a long-lived sleeping coroutine per giveaway: restores that requeue
+# several contests share one heap and one sleep toward the nearest
+# deadline.
+_deadlines = []
+_deadline_seq = itertools.count()
+_scheduler_wakeup = asyncio.Event()
+
+def schedule_giveaway_end(fire_at: float, winners_count: int, prizes: list[str]):
+    heapq.heappush(_deadlines, (fire_at, next(_deadline_seq), winners_count, prizes))
+    _scheduler_wakeup.set()
+
+async def _giveaway_scheduler():
+    while True:
+        if not _deadlines:
+            await _scheduler_wakeup.wait()
+            _scheduler_wakeup.clear()
+            continue
+
+        remaining = _deadlines[0][0] - time.time()
+        if remaining > 0:
+            # Bounded wait so month-long contests don't pin one huge
+            # sleep; a push of an earlier deadline wakes us immediately.
+            try:
+                await asyncio.wait_for(_scheduler_wakeup.wait(), timeout=min(remaining, 3600))
+            except asyncio.TimeoutError:
+                pass
             else:
-                try:
-                    await bot.edit_message_text(
-                        chat_id=giveaway_chat_id,
-                        message_id=giveaway_message_id,
-                        text=NOBODY_JOINED_GIVEAWAY
-                    )
-                    logger.info(f"Successfully updated giveaway message - no participants")
-                except Exception as e:
-                    logger.error(f"Failed to update giveaway message for no participants: {e}")
+                _scheduler_wakeup.clear()
+            continue
+
+        _, _, winners_count, prizes = heapq.heappop(_deadlines)
+        # The scheduler task is shared by every pending giveaway; a draw
+        # that blows up (e.g. DB down in end_giveaway's own error path)
+        # must not kill the loop and strand the remaining deadlines.
+        try:
+            await end_giveaway(winners_count, prizes)
+        except Exception as e:
+            logger.error(f"Error ending scheduled giveaway: {e}")
+
+async def end_giveaway(winners_count: int, prizes: list[str]):
+    global current_contest_id, giveaway_message_id, giveaway_chat_id, giveaway_has_image, giveaway_end_at
+
+    try:
+        if not participant_ids:
+            await _edit_giveaway_message(NOBODY_JOINED_GIVEAWAY)
             current_contest_id = None
             giveaway_message_id = None
             giveaway_chat_id = None
             giveaway_has_image = False
-            giveaway_task = None
-            
-            await save_state_to_db()
+            giveaway_end_at = None
+
+            # Nothing joined, so the participants/winners columns are
+            # already empty — a targeted reset beats a full snapshot.
+            await clear_giveaway_runtime_state(DB_CONFIG)
             return
 
-        winners_count = min(winners_count, len(participants))
-        secure_random = secrets.SystemRandom()
-        selected_winners = secure_random.sample(list(participants.values()), winners_count)
+        winners_count = min(winners_count, len(participant_ids))
+        selected_ids = _SYSTEM_RANDOM.sample(participants_list, winners_count)
+        selected_winners = [deserialize_user(orjson.loads(participants_cache[uid]))
+                            for uid in selected_ids]
+
 
-        from db import assign_winner_to_prize_position
-        
         winners.clear()
+        position_winners = []
         for i, winner in enumerate(selected_winners):
-            position = i + 1  
-            await assign_winner_to_prize_position(current_contest_id, position, winner.id, DB_CONFIG)
+            position = i + 1
+            position_winners.append((position, winner.id))
             prize_name = prizes[i] if i < len(prizes) else f"Prize {position}"
             winners[winner.id] = prize_name
+        await assign_winners_to_prize_positions(current_contest_id, position_winners, DB_CONFIG)
+        _invalidate_state_blobs()
 
-        text = (
+        parts = [
             "✨ The giveaway is over!\n"
             "Thank you for taking part — your energy made it special 💕\n\n"
             "🎀 Winner:\n"
-        )
+        ]
 
         for i, winner in enumerate(selected_winners):
             position = i + 1
-            if position == 1:
-                position_emoji = "🥇"
-            elif position == 2:
-                position_emoji = "🥈"
-            elif position == 3:
-                position_emoji = "🥉"
-            else:
-                position_emoji = "🏅"
+            position_emoji = _position_emoji(position)
             prize_name = prizes[i] if i < len(prizes) else f"Prize {position}"
-            
+
             if winner.username:
                 display_name = f"@{winner.username}"
             else:
@@ -727,56 +836,18 @@ async def end_giveaway(duration: int, winners_count: int, prizes: list[str]):
                     display_name = f"[{name}](tg://user?id={winner.id})"
                 else:
                     display_name = f"[Anonymous](tg://user?id={winner.id})"
-            
-            text += f"{position_emoji} {_ordinal_suffix(position)} place: {display_name} - {prize_name}\n"
 
-        text += (
+            parts.append(f"{position_emoji} {_ordinal_suffix(position)} place: {display_name} - {prize_name}\n")
+
+        parts.append(
             "\nTap the button below to claim your prize 🎁\n"
             "Good luck in the next drop! 🌷"
         )
+        text = ''.join(parts)
 
-        builder = InlineKeyboardBuilder()
-        builder.button(text="🎁 Claim Prize", callback_data="claim")
+        await _edit_giveaway_message(text, reply_markup=CLAIM_MARKUP, parse_mode="Markdown")
 
-        if giveaway_has_image:
-            MAX_CAPTION = 1024
-            caption = text if len(text) <= MAX_CAPTION else (text[:MAX_CAPTION - 1] + "…")
-            try:
-                await bot.edit_message_caption(
-                    chat_id=giveaway_chat_id,
-                    message_id=giveaway_message_id,
-                    caption=caption,
-                    reply_markup=builder.as_markup(),
-                    parse_mode="Markdown"
-                )
-                logger.info(f"Successfully updated giveaway message with results (image)")
-            except Exception as e:
-                logger.warning(f"Failed to edit caption, falling back to text edit: {e}")
-                try:
-                    await bot.edit_message_text(
-                        chat_id=giveaway_chat_id,
-                        message_id=giveaway_message_id,
-                        text=text,
-                        reply_markup=builder.as_markup(),
-                        parse_mode="Markdown"
-                    )
-                    logger.info(f"Successfully updated giveaway message with results (text fallback)")
-                except Exception as e2:
-                    logger.error(f"Failed to update giveaway message: {e2}")
-        else:
-            try:
-                await bot.edit_message_text(
-                    chat_id=giveaway_chat_id,
-                    message_id=giveaway_message_id,
-                    text=text,
-                    reply_markup=builder.as_markup(),
-                    parse_mode="Markdown"
-                )
-                logger.info(f"Successfully updated giveaway message with results")
-            except Exception as e:
-                logger.error(f"Failed to update giveaway message: {e}")
-
-        contest_info = await get_contest_by_id(current_contest_id)
+        contest_info = await get_contest_cached(current_contest_id)
         contest_name = contest_info['name'] if contest_info else "Unknown Contest"
         await notify_winners(selected_winners, contest_name)
         
@@ -784,7 +855,7 @@ async def end_giveaway(duration: int, winners_count: int, prizes: list[str]):
         giveaway_message_id = None
         giveaway_chat_id = None
         giveaway_has_image = False
-        giveaway_task = None
+        giveaway_end_at = None
         
         await save_state_to_db()
         
@@ -794,7 +865,7 @@ async def end_giveaway(duration: int, winners_count: int, prizes: list[str]):
         giveaway_message_id = None
         giveaway_chat_id = None
         giveaway_has_image = False
-        giveaway_task = None
+        giveaway_end_at = None
         await save_state_to_db()
 
 async def notify_winners(winners: list, contest_name: str):
@@ -804,7 +875,7 @@ async def notify_winners(winners: list, contest_name: str):
     group_url = ""
     
     try:
-        contest_info = await get_contest_by_id(current_contest_id)
+        contest_info = await get_contest_cached(current_contest_id)
         if contest_info and contest_info.get('group_title'):
             group_title = contest_info['group_title']
             group_url = contest_info.get('group_url', '')
@@ -871,7 +942,7 @@ async def claim_prize(callback: types.CallbackQuery):
     user_id = callback.from_user.id
 
     if callback.message.chat.id not in ALLOWED_CHATS:
-        await callback.answer("This chat is not authorized for giveaways.", show_alert=True)
+        await callback.answer(CHAT_NOT_AUTHORIZED, show_alert=True)
         return
 
     if user_id not in winners:
@@ -893,7 +964,6 @@ async def claim_command(message: types.Message):
         await message.answer("💬 To claim your reward, please send the /claim command to the bot in a private chat! 🎁")
         return
     
-    from db import get_latest_unclaimed_prize_for_user, mark_prize_as_claimed
     
     winner_prize = await get_latest_unclaimed_prize_for_user(user_id, DB_CONFIG)
     
@@ -911,14 +981,7 @@ async def claim_command(message: types.Message):
     builder = InlineKeyboardBuilder()
     
     position = winner_prize['position']
-    if position == 1:
-        position_emoji = "🥇"
-    elif position == 2:
-        position_emoji = "🥈"
-    elif position == 3:
-        position_emoji = "🥉"
-    else:
-        position_emoji = "🏅"
+    position_emoji = _position_emoji(position)
     message_text += f"{position_emoji} You won {_ordinal_suffix(position)} place!\n"
     message_text += f"🎁 Prize: {winner_prize['prize_name']}\n"
     message_text += f"🏆 Contest ID: {winner_prize['contest_id']}\n\n"
@@ -932,25 +995,13 @@ async def claim_command(message: types.Message):
         reply_markup=builder.as_markup(),
         parse_mode="HTML"
     )
-    
-    await save_state_to_db()
+
+    schedule_state_save()
 
 @dp.message(Command("create_prize"))
-async def create_prize_command(message: types.Message):
+async def create_prize_command(message: types.Message, is_admin: bool = False):
     logger.info(f"Create prize command by user {message.from_user.id} in chat {message.chat.id}")
     
-    is_admin = False
-    
-    if message.chat.type == "private" and ADMIN_ID and message.from_user.id == ADMIN_ID:
-        is_admin = True
-    elif message.chat.id in ALLOWED_CHATS:
-        try:
-            chat_member = await bot.get_chat_member(message.chat.id, message.from_user.id)
-            if chat_member.status in ["creator", "administrator"]:
-                is_admin = True
-        except Exception as e:
-            logger.error(f"Error checking admin permissions: {e}")
-    
     if not is_admin:
         await message.answer("❌ You don't have permission to create prizes.")
         return
@@ -976,7 +1027,6 @@ async def create_prize_command(message: types.Message):
             await message.answer("❌ Invalid prize type. Use: account, link, code, text")
             return
         
-        from db import create_prize
         prize_id = await create_prize(name, description, prize_type, prize_data, DB_CONFIG)
         
         await message.answer(f"✅ Prize created with ID {prize_id}: {name}")
@@ -987,132 +1037,92 @@ async def create_prize_command(message: types.Message):
         await message.answer(f"Error creating prize: {e}")
 
 @dp.message(Command("list_prizes"))
-async def list_prizes_command(message: types.Message):
+async def list_prizes_command(message: types.Message, is_admin: bool = False):
     logger.info(f"List prizes command by user {message.from_user.id} in chat {message.chat.id}")
     
-    is_admin = False
-    
-    if message.chat.type == "private" and ADMIN_ID and message.from_user.id == ADMIN_ID:
-        is_admin = True
-    elif message.chat.id in ALLOWED_CHATS:
-        try:
-            chat_member = await bot.get_chat_member(message.chat.id, message.from_user.id)
-            if chat_member.status in ["creator", "administrator"]:
-                is_admin = True
-        except Exception as e:
-            logger.error(f"Error checking admin permissions: {e}")
-    
     if not is_admin:
         await message.answer("❌ You don't have permission to view prizes.")
         return
     
     try:
-        import aiomysql
-        conn = await aiomysql.connect(**DB_CONFIG)
-        async with conn.cursor() as cursor:
+        pool = await get_db_pool()
+        async with pool.acquire() as conn, conn.cursor() as cursor:
             await cursor.execute("""
-                SELECT id, name, description, prize_type, created_at 
-                FROM prizes 
-                ORDER BY created_at DESC 
+                SELECT id, name, description, prize_type, created_at
+                FROM prizes
+                ORDER BY created_at DESC
                 LIMIT 10
             """)
             prizes = await cursor.fetchall()
-            
-        conn.close()
-        
+
         if not prizes:
             await message.answer("📋 No prizes found.")
             return
         
-        text = "🎁 **Recent Prizes:**\n\n"
-        for prize in prizes:
-            text += f"**ID {prize[0]}**: {prize[1]}\n"
-            text += f"Type: {prize[3]}\n"
-            text += f"Description: {prize[2]}\n"
-            text += f"Created: {prize[4]}\n\n"
-        
-        await message.answer(text, parse_mode="Markdown")
+        parts = ["🎁 **Recent Prizes:**\n\n"]
+        parts.extend(
+            f"**ID {prize[0]}**: {prize[1]}\nType: {prize[3]}\nDescription: {prize[2]}\nCreated: {prize[4]}\n\n"
+            for prize in prizes
+        )
+
+        await message.answer(''.join(parts), parse_mode="Markdown")
         
     except Exception as e:
         logger.error(f"Error listing prizes: {e}")
         await message.answer(f"Error listing prizes: {e}")
 
 @dp.message(Command("my_groups"))
-async def my_groups_command(message: types.Message):
+async def my_groups_command(message: types.Message, is_admin: bool = False):
     logger.info(f"My groups command by user {message.from_user.id} in chat {message.chat.id}")
     
-    is_admin = False
-    
-    if message.chat.type == "private" and ADMIN_ID and message.from_user.id == ADMIN_ID:
-        is_admin = True
-    elif message.chat.id in ALLOWED_CHATS:
-        try:
-            chat_member = await bot.get_chat_member(message.chat.id, message.from_user.id)
-            if chat_member.status in ["creator", "administrator"]:
-                is_admin = True
-        except Exception as e:
-            logger.error(f"Error checking admin permissions: {e}")
-    
     if not is_admin:
         await message.answer("❌ You don't have permission to view group information.")
         return
     
     try:
-        import aiomysql
-        conn = await aiomysql.connect(**DB_CONFIG)
-        async with conn.cursor() as cursor:
+        pool = await get_db_pool()
+        async with pool.acquire() as conn, conn.cursor() as cursor:
             await cursor.execute("""
                 SELECT DISTINCT group_title, group_url, COUNT(*) as contest_count
-                FROM contests 
-                WHERE group_title IS NOT NULL 
+                FROM contests
+                WHERE group_title IS NOT NULL
                 GROUP BY group_title, group_url
                 ORDER BY contest_count DESC
             """)
             groups = await cursor.fetchall()
-            
-        conn.close()
-        
+
         if not groups:
             await message.answer("📋 No groups found in database.")
             return
         
-        text = "🏢 **Your Groups:**\n\n"
+        parts = ["🏢 **Your Groups:**\n\n"]
         for group in groups:
             group_title = group[0] or "Unknown Group"
             group_url = group[1] or "No URL"
             contest_count = group[2]
-            
-            text += f"**{group_title}**\n"
-            text += f"🔗 URL: `{group_url}`\n"
-            text += f"📊 Contests: {contest_count}\n\n"
-        
-        text += "💡 **Copy commands:**\n"
-        text += "• To copy group URL: Click on the URL above\n"
-        text += "• To create contest: Use `/create_contest` in the group\n"
-        
-        await message.answer(text, parse_mode="Markdown")
+
+            parts.append(f"**{group_title}**\n🔗 URL: `{group_url}`\n📊 Contests: {contest_count}\n\n")
+
+        parts.append(
+            "💡 **Copy commands:**\n"
+            "• To copy group URL: Click on the URL above\n"
+            "• To create contest: Use `/create_contest` in the group\n"
+        )
+
+        await message.answer(''.join(parts), parse_mode="Markdown")
         
     except Exception as e:
         logger.error(f"Error listing groups: {e}")
         await message.answer(f"Error listing groups: {e}")
 
 @dp.message(Command("group_info"))
-async def group_info_command(message: types.Message):
+async def group_info_command(message: types.Message, is_admin: bool = False):
     logger.info(f"Group info command by user {message.from_user.id} in chat {message.chat.id}")
     
     if message.chat.type == "private":
         await message.answer("❌ This command only works in groups.")
         return
     
-    is_admin = False
-    if message.chat.id in ALLOWED_CHATS:
-        try:
-            chat_member = await bot.get_chat_member(message.chat.id, message.from_user.id)
-            if chat_member.status in ["creator", "administrator"]:
-                is_admin = True
-        except Exception as e:
-            logger.error(f"Error checking admin permissions: {e}")
-    
     if not is_admin:
         await message.answer("❌ You don't have permission to view group information.")
         return
@@ -1133,18 +1143,15 @@ async def group_info_command(message: types.Message):
                 logger.warning(f"Could not export invite link: {e}")
                 group_url = "No URL available"
         
-        import aiomysql
-        conn = await aiomysql.connect(**DB_CONFIG)
-        async with conn.cursor() as cursor:
+        pool = await get_db_pool()
+        async with pool.acquire() as conn, conn.cursor() as cursor:
             await cursor.execute("""
-                SELECT COUNT(*) as contest_count, 
+                SELECT COUNT(*) as contest_count,
                        COUNT(CASE WHEN group_title = %s THEN 1 END) as matching_contests
                 FROM contests
             """, (group_title,))
             stats = await cursor.fetchone()
-            
-        conn.close()
-        
+
         text = f"🏢 **Group Information:**\n\n"
         text += f"**Name:** {group_title}\n"
         text += f"**ID:** `{message.chat.id}`\n"
@@ -1164,21 +1171,9 @@ async def group_info_command(message: types.Message):
         await message.answer(f"Error getting group info: {e}")
 
 @dp.message(Command("admin_help"))
-async def admin_help_command(message: types.Message):
+async def admin_help_command(message: types.Message, is_admin: bool = False):
     logger.info(f"Admin help command by user {message.from_user.id} in chat {message.chat.id}")
     
-    is_admin = False
-    
-    if message.chat.type == "private" and ADMIN_ID and message.from_user.id == ADMIN_ID:
-        is_admin = True
-    elif message.chat.id in ALLOWED_CHATS:
-        try:
-            chat_member = await bot.get_chat_member(message.chat.id, message.from_user.id)
-            if chat_member.status in ["creator", "administrator"]:
-                is_admin = True
-        except Exception as e:
-            logger.error(f"Error checking admin permissions: {e}")
-    
     if not is_admin:
         await message.answer("❌ You don't have permission to view admin commands.")
         return
@@ -1220,20 +1215,64 @@ async def admin_help_command(message: types.Message):
     
     await message.answer(help_text, parse_mode="Markdown")
 
-async def _check_admin_permissions(message: types.Message) -> bool:
-    try:
-        chat_member = await bot.get_chat_member(message.chat.id, message.from_user.id)
-        return chat_member.status in ["creator", "administrator"]
-    except Exception:
-        return False
+# Telegram admin status barely changes minute to minute, so cache the
+# get_chat_member round-trip per (chat, user) instead of paying an HTTPS
+# request on every admin command.
+_ADMIN_CACHE = {}
+ADMIN_CACHE_TTL = 60
 
+# Telegram file_id per image URL: re-sending by file_id skips both our
+# download and the upload, Telegram serves the file from its own cache.
+_IMAGE_FILE_ID_CACHE = {}
 
+async def get_chat_member_status(chat_id: int, user_id: int) -> str:
+    key = (chat_id, user_id)
+    now = time.monotonic()
+    cached = _ADMIN_CACHE.get(key)
+    if cached is not None and cached[1] > now:
+        return cached[0]
 
-@dp.message(Command("start_giveaway"))
-async def start_giveaway_command(message: types.Message):
-    logger.info(f"Start giveaway command by user {message.from_user.id} in chat {message.chat.id}")
-    logger.info(f"ALLOWED_CHATS: {ALLOWED_CHATS}")
-    logger.info(f"Chat type: {message.chat.type}")
+    chat_member = await bot.get_chat_member(chat_id, user_id)
+    _ADMIN_CACHE[key] = (chat_member.status, now + ADMIN_CACHE_TTL)
+    return chat_member.status
+
+async def is_admin(message: types.Message) -> bool:
+    if message.chat.type == "private" and ADMIN_ID and message.from_user.id == ADMIN_ID:
+        return True
+    if message.chat.id in ALLOWED_CHATS:
+        try:
+            status = await get_chat_member_status(message.chat.id, message.from_user.id)
+            return status in ("creator", "administrator")
+        except Exception as e:
+            logger.error(f"Error checking admin permissions: {e}")
+    return False
+
+_ADMIN_GATED_COMMANDS = frozenset((
+    '/start_giveaway', '/contest', '/create_contest', '/stats',
+    '/set_prize_data', '/prize_info', '/cancel_giveaway', '/create_prize',
+    '/list_prizes', '/my_groups', '/group_info', '/admin_help',
+))
+
+# Resolves the admin flag once per update and injects it as is_admin
+# into the handler data, so handlers gate on a bool instead of each
+# repeating the get_chat_member try/except. Only commands that actually
+# need the check trigger the (cached) lookup; plain chatter passes
+# straight through.
+class AdminGateMiddleware(BaseMiddleware):
+    async def __call__(self, handler, event, data):
+        text = event.text
+        if text and text.startswith('/'):
+            command = text.split(maxsplit=1)[0].partition('@')[0]
+            if command in _ADMIN_GATED_COMMANDS:
+                data['is_admin'] = await is_admin(event)
+        return await handler(event, data)
+
+dp.message.middleware(AdminGateMiddleware())
+
+
+@dp.message(Command("start_giveaway", "contest"))
+async def start_giveaway_command(message: types.Message, is_admin: bool = False):
+    logger.info("Start giveaway command by user %s in chat %s", message.from_user.id, message.chat.id)
     
     if message.chat.id not in ALLOWED_CHATS:
         logger.warning(f"Chat {message.chat.id} not in whitelist. Allowed chats: {ALLOWED_CHATS}")
@@ -1245,105 +1284,138 @@ async def start_giveaway_command(message: types.Message):
         logger.warning(f"Attempted to start giveaway while one is running by user {message.from_user.id}")
         return
     
-    try:
-        chat_member = await bot.get_chat_member(message.chat.id, message.from_user.id)
-        if chat_member.status not in ["creator", "administrator"]:
-            await message.answer(CHAT_NOT_AUTHORIZED)
-            return
-    except Exception as e:
-        logger.error(f"Error checking admin status: {e}")
-        await message.answer(ERROR_CHECKING_ADMIN_STATUS)
+    if not is_admin:
+        await message.answer(CHAT_NOT_AUTHORIZED)
         return
-    
-    args = message.text.split()[1:]
-    if not args:
-        contests = await list_contests()
-        if not contests:
+
+    # Only the first argument matters, so stop splitting after it instead
+    # of tokenizing the whole message.
+    parts = message.text.split(maxsplit=2)
+    if len(parts) < 2:
+        listing = await get_contest_listing()
+        if listing is None:
             await message.answer(CHAT_NOT_AUTHORIZED)
             return
-        
-        text = "Available contests:\n"
-        for contest in contests:
-            text += f"ID {contest['id']}: {contest['name']} ({contest['duration']}s, {contest['winners_count']} winners)\n"
-        await message.answer(text)
+
+        await message.answer(listing)
         return
-    
+
     try:
-        contest_id = int(args[0])
+        contest_id = int(parts[1])
     except ValueError:
         await message.answer(CHAT_NOT_AUTHORIZED)
         return
     
-    contest = await get_contest_by_id(contest_id)
+    contest = await get_contest_cached(contest_id)
     if not contest:
         await message.answer(CHAT_NOT_AUTHORIZED)
         return
     
-    global giveaway_message_id, giveaway_chat_id, giveaway_has_image, current_contest_id
-    
-    participants.clear()
+    global giveaway_message_id, giveaway_chat_id, giveaway_has_image, current_contest_id, giveaway_end_at
+
+    # Kick the image download off immediately so it overlaps the state
+    # reset and participant-table clear below instead of running after
+    # them. Only needed for http(s) rows with no cached file_id.
+    img_task = None
+    if (contest['image_url']
+            and contest['image_url'].startswith(('http://', 'https://'))
+            and contest['image_url'] not in _IMAGE_FILE_ID_CACHE):
+        img_task = asyncio.create_task(download_image(contest['image_url']))
+
+    participant_ids.clear()
+    participants_cache.clear()
+    del participants_list[:]
     winners.clear()
     claimed_winners.clear()
+    _invalidate_state_blobs()
     current_contest_id = contest_id
-    
-    giveaway_has_image = False 
-    
-    builder = InlineKeyboardBuilder()
-    builder.button(text="🎁 Join", callback_data="join")
-    
+
+    await clear_contest_participants(contest_id, DB_CONFIG)
+
+    giveaway_has_image = False
+
+    # Rendered once: the photo/cache/download fallback chain below reuses
+    # the same text up to three times.
+    start_text = create_giveaway_start_message(contest['name'], contest['duration'],
+                                               contest['winners_count'], contest['prizes'])
+
+    sent_msg = None
     if contest['image_url']:
+        # Non-http values are stored Telegram file_ids; http(s) URLs may
+        # still have a file_id cached from an earlier upload this run.
+        if contest['image_url'].startswith(('http://', 'https://')):
+            cached_file_id = _IMAGE_FILE_ID_CACHE.get(contest['image_url'])
+        else:
+            cached_file_id = contest['image_url']
+        if cached_file_id:
+            try:
+                sent_msg = await message.answer_photo(
+                    photo=cached_file_id,
+                    caption=start_text,
+                    reply_markup=JOIN_MARKUP
+                )
+                giveaway_has_image = True
+            except Exception as e:
+                logger.warning(f"Cached file_id for {contest['image_url']} rejected, re-downloading: {e}")
+                _IMAGE_FILE_ID_CACHE.pop(contest['image_url'], None)
+
+    if sent_msg is None and contest['image_url']:
         try:
-            photo_file = await download_image(contest['image_url'])
+            if img_task is not None:
+                photo_file = await img_task
+            else:
+                photo_file = await download_image(contest['image_url'])
             if photo_file is not None:
                 sent_msg = await message.answer_photo(
                     photo=photo_file,
-                    caption=create_giveaway_start_message(contest['name'], contest['duration'], contest['winners_count'], contest['prizes']),
-                    reply_markup=builder.as_markup()
+                    caption=start_text,
+                    reply_markup=JOIN_MARKUP
                 )
                 giveaway_has_image = True
+                if sent_msg.photo:
+                    _IMAGE_FILE_ID_CACHE[contest['image_url']] = sent_msg.photo[-1].file_id
             else:
                 sent_msg = await message.answer(
-                    create_giveaway_start_message(contest['name'], contest['duration'], contest['winners_count'], contest['prizes']),
-                    reply_markup=builder.as_markup()
+                    start_text,
+                    reply_markup=JOIN_MARKUP
                 )
                 giveaway_has_image = False
         except Exception as e:
             logger.warning(f"Failed to download image from {contest['image_url']}: {e}")
             warning_msg = "The image is in an unsupported format (AVIF/HEIC). The contest has been created without an image.\n\n"
             sent_msg = await message.answer(
-                warning_msg + create_giveaway_start_message(contest['name'], contest['duration'], contest['winners_count'], contest['prizes']),
-                reply_markup=builder.as_markup()
+                warning_msg + start_text,
+                reply_markup=JOIN_MARKUP
             )
             giveaway_has_image = False
-    else:
+    elif sent_msg is None:
         sent_msg = await message.answer(
-            create_giveaway_start_message(contest['name'], contest['duration'], contest['winners_count'], contest['prizes']),
-            reply_markup=builder.as_markup()
+            start_text,
+            reply_markup=JOIN_MARKUP
         )
         giveaway_has_image = False
 
     giveaway_message_id = sent_msg.message_id
     giveaway_chat_id = sent_msg.chat.id
-    await save_state_to_db()
-    
-    global giveaway_task
-    giveaway_task = asyncio.create_task(end_giveaway(contest['duration'], contest['winners_count'], contest['prizes']))
+    giveaway_end_at = int(time.time()) + contest['duration']
+    schedule_state_save()
+
+    schedule_giveaway_end(giveaway_end_at, contest['winners_count'], contest['prizes'])
 
 
 
 async def _initialize_giveaway_state(contest_id: int) -> None:
     global giveaway_message_id, giveaway_chat_id, giveaway_has_image, current_contest_id
     
-    participants.clear()
+    participant_ids.clear()
+    participants_cache.clear()
+    del participants_list[:]
     winners.clear()
     claimed_winners.clear()
+    _invalidate_state_blobs()
     current_contest_id = contest_id
     giveaway_has_image = False
 
-@dp.message(Command("contest"))
-async def contest_command(message: types.Message):
-    await start_giveaway_command(message)
-
 def _validate_image_url(url: str) -> bool:
     if not url or not is_safe_link(url):
         logger.warning(f"Invalid URL format: {url}")
@@ -1368,36 +1440,49 @@ def _validate_content_type(content_type: str, url: str) -> bool:
         return False
     return True
 
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
 def _validate_content_size(content_length: str, url: str) -> bool:
-    if content_length and int(content_length) > 20 * 1024 * 1024:
+    if content_length and int(content_length) > MAX_IMAGE_BYTES:
         logger.warning(f"Image too large ({content_length} bytes) for URL: {url}")
         return False
     return True
 
 def _validate_downloaded_data(data: bytes, url: str) -> bool:
-    if not data:
+    n = len(data)
+    if not n:
         logger.warning(f"Empty image data for URL: {url}")
         return False
-    if len(data) > 20 * 1024 * 1024:
-        logger.warning(f"Downloaded image too large ({len(data)} bytes) for URL: {url}")
+    if n > MAX_IMAGE_BYTES:
+        logger.warning(f"Downloaded image too large ({n} bytes) for URL: {url}")
         return False
     return True
 
+# All signatures live in the first 12 bytes; keyed by exact prefix so
+# detection is a few dict probes on a short slice instead of a chain of
+# startswith scans over the full body.
+_MAGIC_BYTES = {
+    b'\xff\xd8\xff': 'jpeg',
+    b'GIF87a': 'gif',
+    b'GIF89a': 'gif',
+    b'\x89PNG\r\n\x1a\n': 'png',
+    b'\x00\x00\x00 ftypavif': 'avif',
+}
+
 def _detect_image_format(data: bytes, url: str) -> str | None:
-    if data.startswith(b'\xff\xd8\xff'):
-        return 'jpeg'
-    elif data.startswith(b'\x89PNG\r\n\x1a\n'):
-        return 'png'
-    elif data.startswith(b'GIF87a') or data.startswith(b'GIF89a'):
-        return 'gif'
-    elif data.startswith(b'RIFF') and b'WEBP' in data[:12]:
-        return 'webp'
-    elif data.startswith(b'\x00\x00\x00 ftypavif'):
+    head = data[:12]
+    fmt = (_MAGIC_BYTES.get(head[:3]) or _MAGIC_BYTES.get(head[:6])
+           or _MAGIC_BYTES.get(head[:8]) or _MAGIC_BYTES.get(head))
+    if fmt is None and head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        fmt = 'webp'
+
+    if fmt == 'avif':
         logger.warning(f"AVIF format detected - not supported by Telegram Bot API: {url}")
         return None
-    else:
+    if fmt is None:
         logger.warning(f"Unknown image format detected in data for URL: {url}")
         return 'unknown'
+    return fmt
 
 def _validate_image_format(subtype: str, url: str) -> bool:
     supported_formats = ['jpeg', 'jpg', 'png', 'gif', 'webp']
@@ -1407,64 +1492,126 @@ def _validate_image_format(subtype: str, url: str) -> bool:
     return True
 
 def _create_filename(actual_format: str, subtype: str, data: bytes) -> str:
-    if actual_format == 'unknown' and len(data) > 100:
-        logger.warning(f"Unknown image format, but data size suggests it might be valid: {len(data)} bytes")
+    n = len(data)
+    if actual_format == 'unknown' and n > 100:
+        logger.warning(f"Unknown image format, but data size suggests it might be valid: {n} bytes")
         return f"image.{subtype}"
     return f"image.{actual_format if actual_format != 'unknown' else subtype}"
 
+# One ClientSession for all image downloads: connections (and their TLS
+# handshakes) are reused across contests instead of rebuilt per call.
+_http_session = None
+
+async def get_http_session() -> aiohttp.ClientSession:
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300, keepalive_timeout=60),
+            headers=_get_http_headers()
+        )
+    return _http_session
+
+# Validators and body kept per URL so repeat fetches can issue a
+# conditional GET and skip the transfer entirely on 304 Not Modified.
+# Bounded by total body bytes; eviction drops the oldest entries.
+_IMAGE_HTTP_CACHE = {}
+IMAGE_HTTP_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+def _remember_image_response(url: str, etag: str | None, last_modified: str | None,
+                             data: bytes, filename: str) -> None:
+    if not (etag or last_modified):
+        return
+    _IMAGE_HTTP_CACHE.pop(url, None)
+    _IMAGE_HTTP_CACHE[url] = (etag, last_modified, data, filename)
+    total = sum(len(entry[2]) for entry in _IMAGE_HTTP_CACHE.values())
+    while total > IMAGE_HTTP_CACHE_MAX_BYTES and len(_IMAGE_HTTP_CACHE) > 1:
+        oldest = next(iter(_IMAGE_HTTP_CACHE))
+        total -= len(_IMAGE_HTTP_CACHE.pop(oldest)[2])
+
 async def download_image(url: str) -> BufferedInputFile | None:
-    logger.info(f"Starting image download from: {url}")
-    
+    logger.info("Starting image download from: %s", url)
+
     try:
         if not _validate_image_url(url):
             return None
-            
-        timeout = aiohttp.ClientTimeout(total=15)  
-        headers = _get_http_headers()
-        
-        async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
-            logger.info(f"Making request to: {url}")
-            async with session.get(url, allow_redirects=True) as resp:
-                logger.info(f"Response status: {resp.status}")
-                logger.info(f"Response headers: {dict(resp.headers)}")
-                
-                if not _validate_response_status(resp, url):
-                    return None
-                    
-                content_type = resp.headers.get("Content-Type", "").lower()
-                logger.info(f"Content-Type: {content_type}")
-                
-                if not _validate_content_type(content_type, url):
-                    return None
-                    
-                content_length = resp.headers.get('Content-Length')
-                if content_length:
-                    logger.info(f"Content-Length: {content_length} bytes")
-                    if not _validate_content_size(content_length, url):
-                        return None
+
+        timeout = aiohttp.ClientTimeout(total=15)
+        session = await get_http_session()
+
+        cached = _IMAGE_HTTP_CACHE.get(url)
+        cond_headers = {}
+        if cached:
+            if cached[0]:
+                cond_headers['If-None-Match'] = cached[0]
+            if cached[1]:
+                cond_headers['If-Modified-Since'] = cached[1]
+
+        async with session.get(url, allow_redirects=True, timeout=timeout,
+                               headers=cond_headers or None) as resp:
+            logger.debug("Response status: %s", resp.status)
+            if logger.isEnabledFor(logging.DEBUG):
+                # dict(resp.headers) is costly to build even when the
+                # record would be dropped.
+                logger.debug("Response headers: %s", dict(resp.headers))
+
+            if cached and resp.status == 304:
+                logger.info("Image unchanged (304), serving %s from cache", url)
+                return BufferedInputFile(cached[2], cached[3])
+
+            if not _validate_response_status(resp, url):
+                return None
                     
-                data = await resp.read()
-                logger.info(f"Downloaded {len(data)} bytes")
-                
-                if not _validate_downloaded_data(data, url):
+            content_type = resp.headers.get("Content-Type", "").lower()
+            logger.debug("Content-Type: %s", content_type)
+
+            if not _validate_content_type(content_type, url):
+                return None
+
+            # Checked before the body is streamed: a disallowed subtype
+            # (e.g. image/avif) is rejected without transferring a byte.
+            subtype = content_type.split("/", 1)[1].split(';')[0] if "/" in content_type else "jpg"
+            if not _validate_image_format(subtype, url):
+                return None
+
+            content_length = resp.headers.get('Content-Length')
+            if content_length:
+                logger.debug("Content-Length: %s bytes", content_length)
+                if not _validate_content_size(content_length, url):
                     return None
                     
-                subtype = content_type.split("/", 1)[1].split(';')[0] if "/" in content_type else "jpg"
-                logger.info(f"Image subtype from Content-Type: {subtype}")
-                
-                if not _validate_image_format(subtype, url):
-                    return None
-                
-                actual_format = _detect_image_format(data, url)
-                if actual_format is None:
+            # Sniff the magic bytes off the first few bytes so an AVIF
+            # body lying behind an image/* Content-Type is rejected
+            # before the transfer, not after 20 MB of it.
+            head = await resp.content.read(32)
+            actual_format = _detect_image_format(head, url)
+            if actual_format is None:
+                return None
+
+            # Stream the rest into a bounded buffer instead of
+            # resp.read(): a body that lies about (or omits)
+            # Content-Length is aborted as soon as it crosses the cap
+            # rather than buffered whole.
+            buf = bytearray(head)
+            async for chunk in resp.content.iter_chunked(65536):
+                buf.extend(chunk)
+                if len(buf) > MAX_IMAGE_BYTES:
+                    logger.warning(f"Image exceeded {MAX_IMAGE_BYTES} bytes mid-download, aborting: {url}")
                     return None
+            data = bytes(buf)
+            n = len(data)
+            logger.debug("Downloaded %d bytes", n)
+
+            if not _validate_downloaded_data(data, url):
+                return None
+
+            logger.debug("Actual image format detected: %s", actual_format)
+
+            filename = _create_filename(actual_format, subtype, data)
+            _remember_image_response(url, resp.headers.get('ETag'),
+                                     resp.headers.get('Last-Modified'), data, filename)
+            logger.info("Successfully downloaded image from %s (%d bytes, %s)", url, n, actual_format)
                 
-                logger.info(f"Actual image format detected: {actual_format}")
-                
-                filename = _create_filename(actual_format, subtype, data)
-                logger.info(f"Successfully downloaded image from {url} ({len(data)} bytes, {actual_format})")
-                
-                return BufferedInputFile(data, filename)
+            return BufferedInputFile(data, filename)
                 
     except aiohttp.ClientError as e:
         logger.warning(f"Network error downloading image from {url}: {e}")
@@ -1476,31 +1623,28 @@ async def download_image(url: str) -> BufferedInputFile | None:
 async def _get_attached_image_url(message: types.Message) -> str | None:
     if not message.photo:
         return None
-    photo = message.photo[-1]
-    file_info = await bot.get_file(photo.file_id)
-    image_url = f"https://api.telegram.org/file/bot{TOKEN}/{file_info.file_path}"
-    logger.info(f"Image attached: {image_url}")
-    return image_url
-
-def _is_image_url(url: str) -> bool:
-    if not is_safe_link(url):
-        return False
-    return any(ext in url.lower() for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp'])
-
-def _is_potential_image_url(url: str) -> bool:
-    return any(keyword in url.lower() for keyword in ['image', 'photo', 'img'])
+    # Store the Telegram file_id rather than a file URL: re-sending by
+    # file_id is served entirely server-side, so /start_giveaway never
+    # re-downloads and re-uploads the image bytes.
+    file_id = message.photo[-1].file_id
+    logger.info(f"Image attached: file_id={file_id}")
+    return file_id
+
+# Compiled once: one case-insensitive scan per URL instead of lowering
+# the whole string and probing it substring-by-substring.
+_IMG_EXT_RE = re.compile(r'\.(?:jpe?g|png|gif|webp)', re.IGNORECASE)
+_IMG_HINT_RE = re.compile(r'image|photo|img', re.IGNORECASE)
 
 def _process_remaining_args(remaining_args: list) -> tuple[list, str | None]:
     prizes = []
     url_image = None
-    
+
     for arg in remaining_args:
-        logger.info(f"Processing arg: '{arg}'")
         if is_safe_link(arg):
-            if _is_image_url(arg):
+            if _IMG_EXT_RE.search(arg):
                 url_image = arg
                 logger.info(f"Detected image URL: {arg}")
-            elif _is_potential_image_url(arg):
+            elif _IMG_HINT_RE.search(arg):
                 url_image = arg
                 logger.info(f"Detected potential image URL (no extension): {arg}")
             else:
@@ -1508,10 +1652,16 @@ def _process_remaining_args(remaining_args: list) -> tuple[list, str | None]:
                 prizes.append(arg) 
         else:
             prizes.append(arg)
-            logger.info(f"Added prize: '{arg}'")
     
     return prizes, url_image
 
+def _split_command_args(text: str) -> list[str]:
+    # shlex runs a full POSIX lexer state machine; only pay for it when
+    # the message actually uses quoting.
+    if '"' in text or "'" in text:
+        return shlex.split(text)
+    return text.split()
+
 async def _create_contest_response(message: types.Message, name: str, duration: int, winners_count: int, prizes: list, 
                                  image_url: str | None, url_image: str | None) -> None:
     final_image_url = image_url if image_url else url_image
@@ -1539,7 +1689,8 @@ async def _create_contest_response(message: types.Message, name: str, duration:
         logger.warning(f"Could not retrieve group info for contest: {e}")
     
     contest_id = await add_contest(name, duration, winners_count, prizes, final_image_url, group_title, group_url)
-    
+    _invalidate_contest_cache(contest_id)
+
     duration_formatted = format_duration(duration)
     response_text = f"Contest '{name}' created with ID {contest_id}.\nDuration: {duration_formatted}\nUse /start_giveaway {contest_id} to start it."
     if final_image_url:
@@ -1549,31 +1700,22 @@ async def _create_contest_response(message: types.Message, name: str, duration:
     logger.info(f"Created contest {contest_id}: {name} with image: {final_image_url} and group: {group_title}")
 
 @dp.message(Command("create_contest"))
-async def create_contest_command(message: types.Message):
-    logger.info(f"Create contest command by user {message.from_user.id} in chat {message.chat.id}")
-    logger.info(f"ALLOWED_CHATS: {ALLOWED_CHATS}")
-    logger.info(f"Chat type: {message.chat.type}")
+async def create_contest_command(message: types.Message, is_admin: bool = False):
+    logger.info("Create contest command by user %s in chat %s", message.from_user.id, message.chat.id)
     
     if message.chat.id not in ALLOWED_CHATS:
         logger.warning(f"Chat {message.chat.id} not in whitelist. Allowed chats: {ALLOWED_CHATS}")
         await message.answer(CHAT_NOT_AUTHORIZED)
         return
     
-    try:
-        chat_member = await bot.get_chat_member(message.chat.id, message.from_user.id)
-        if chat_member.status not in ["creator", "administrator"]:
-            await message.answer(CHAT_NOT_AUTHORIZED)
-            return
-    except Exception as e:
-        logger.error(f"Error checking admin status: {e}")
-        await message.answer(ERROR_CHECKING_ADMIN_STATUS)
+    if not is_admin:
+        await message.answer(CHAT_NOT_AUTHORIZED)
         return
-    
+
     image_url = await _get_attached_image_url(message)
     
-    args = shlex.split(message.text)[1:]
-    logger.info(f"Parsed args: {args}")
-    logger.info(f"Number of args: {len(args)}")
+    args = _split_command_args(message.text)[1:]
+    logger.debug("Parsed args (%d): %s", len(args), args)
     
     if len(args) < 3:
         await message.answer(USAGE_CREATE_CONTEST)
@@ -1585,12 +1727,9 @@ async def create_contest_command(message: types.Message):
         winners_count = int(args[2])
         
         remaining_args = args[3:] if len(args) > 3 else []
-        logger.info(f"Remaining args for prizes: {remaining_args}")
         
         prizes, url_image = _process_remaining_args(remaining_args)
-        
-        logger.info(f"Final prizes list: {prizes}")
-        logger.info(f"Final image URL: {url_image}")
+        logger.debug("Final prizes list: %s, image URL: %s", prizes, url_image)
         
         await _create_contest_response(message, name, duration, winners_count, prizes, image_url, url_image)
     except ValueError as e:
@@ -1601,21 +1740,15 @@ async def create_contest_command(message: types.Message):
         logger.error(f"Error creating contest: {e}")
 
 @dp.message(Command("stats"))
-async def stats_command(message: types.Message):
+async def stats_command(message: types.Message, is_admin: bool = False):
     logger.info(f"Stats command by user {message.from_user.id} in chat {message.chat.id}")
     
     if message.chat.id not in ALLOWED_CHATS:
         await message.answer(CHAT_NOT_AUTHORIZED)
         return
     
-    try:
-        chat_member = await bot.get_chat_member(message.chat.id, message.from_user.id)
-        if chat_member.status not in ["creator", "administrator"]:
-            await message.answer("Only admins can view stats.")
-            return
-    except Exception as e:
-        logger.error(f"Error checking admin status: {e}")
-        await message.answer(ERROR_CHECKING_ADMIN_STATUS)
+    if not is_admin:
+        await message.answer("Only admins can view stats.")
         return
     
     if not current_contest_id:
@@ -1623,18 +1756,18 @@ async def stats_command(message: types.Message):
         return
     
     try:
-        contest = await get_contest_by_id(current_contest_id)
+        contest = await get_contest_cached(current_contest_id)
         if not contest:
             await message.answer("Contest not found.")
             return
         
         text = f"📊 Giveaway Stats for '{contest['name']}'\n"
-        text += f"👥 Participants: {len(participants)}\n"
+        text += f"👥 Participants: {len(participant_ids)}\n"
         text += f"🏆 Winners: {len(winners)}\n"
         text += f"✅ Claimed: {len(claimed_winners)}\n"
         text += f"⏰ Duration: {contest['duration']} seconds\n"
         if contest['prizes']:
-            text += f"🎁 Prizes: {', '.join(contest['prizes'])}"
+            text += f"🎁 Prizes: {contest['prizes_joined']}"
         
         await message.answer(text)
         logger.info(f"Stats requested for contest {current_contest_id}")
@@ -1643,24 +1776,18 @@ async def stats_command(message: types.Message):
         logger.error(f"Error getting stats: {e}")
 
 @dp.message(Command("set_prize_data"))
-async def set_prize_data_command(message: types.Message):
+async def set_prize_data_command(message: types.Message, is_admin: bool = False):
     logger.info(f"Set prize data command by user {message.from_user.id} in chat {message.chat.id}")
     
     if message.chat.id not in ALLOWED_CHATS:
         await message.answer(CHAT_NOT_AUTHORIZED)
         return
     
-    try:
-        chat_member = await bot.get_chat_member(message.chat.id, message.from_user.id)
-        if chat_member.status not in ["creator", "administrator"]:
-            await message.answer("Only admins can set prize data.")
-            return
-    except Exception as e:
-        logger.error(f"Error checking admin status: {e}")
-        await message.answer(ERROR_CHECKING_ADMIN_STATUS)
+    if not is_admin:
+        await message.answer("Only admins can set prize data.")
         return
     
-    args = shlex.split(message.text)[1:]
+    args = _split_command_args(message.text)[1:]
     if len(args) < 3:
         await message.answer("Usage: /set_prize_data <contest_id> <position> <prize_name> <prize_value>\n\nExample: /set_prize_data 1 1 \"100 USDT\" \"https://example.com/claim\"")
         return
@@ -1673,27 +1800,23 @@ async def set_prize_data_command(message: types.Message):
         
         prize_type = 'link' if is_safe_link(prize_value) else 'text'
         
-        from db import get_db_connection
-        conn = await get_db_connection(DB_CONFIG)
-        try:
-            async with conn.cursor() as cursor:
-                await cursor.execute("""
-                    UPDATE contest_prizes 
-                    SET prize_name = %s, prize_type = %s, prize_value = %s 
-                    WHERE contest_id = %s AND position = %s
-                """, (prize_name, prize_type, prize_value, contest_id, position))
-                
-                if cursor.rowcount == 0:
-                    await message.answer(f"No prize found for contest {contest_id}, position {position}")
-                    return
-                
-                await conn.commit()
-            
-            await message.answer(f"✅ Prize updated for contest {contest_id}, position {position}:\n🎁 Name: {prize_name}\n🔗 Type: {prize_type}\n💎 Value: {prize_value}")
-            logger.info(f"Prize data updated for contest {contest_id} by user {message.from_user.id}")
-        finally:
-            conn.close()
-        
+        pool = await get_db_pool()
+        async with pool.acquire() as conn, conn.cursor() as cursor:
+            await cursor.execute("""
+                UPDATE contest_prizes
+                SET prize_name = %s, prize_type = %s, prize_value = %s
+                WHERE contest_id = %s AND position = %s
+            """, (prize_name, prize_type, prize_value, contest_id, position))
+
+            if cursor.rowcount == 0:
+                await message.answer(f"No prize found for contest {contest_id}, position {position}")
+                return
+
+            await conn.commit()
+
+        await message.answer(f"✅ Prize updated for contest {contest_id}, position {position}:\n🎁 Name: {prize_name}\n🔗 Type: {prize_type}\n💎 Value: {prize_value}")
+        logger.info(f"Prize data updated for contest {contest_id} by user {message.from_user.id}")
+
     except ValueError as e:
         await message.answer(f"Invalid parameters: {e}")
         logger.error(f"Invalid prize data parameters: {e}")
@@ -1702,24 +1825,18 @@ async def set_prize_data_command(message: types.Message):
         logger.error(f"Error setting prize data: {e}")
 
 @dp.message(Command("prize_info"))
-async def prize_info_command(message: types.Message):
+async def prize_info_command(message: types.Message, is_admin: bool = False):
     logger.info(f"Prize info command by user {message.from_user.id} in chat {message.chat.id}")
     
     if message.chat.id not in ALLOWED_CHATS:
         await message.answer(CHAT_NOT_AUTHORIZED)
         return
     
-    try:
-        chat_member = await bot.get_chat_member(message.chat.id, message.from_user.id)
-        if chat_member.status not in ["creator", "administrator"]:
-            await message.answer("Only admins can view prize info.")
-            return
-    except Exception as e:
-        logger.error(f"Error checking admin status: {e}")
-        await message.answer(ERROR_CHECKING_ADMIN_STATUS)
+    if not is_admin:
+        await message.answer("Only admins can view prize info.")
         return
     
-    args = shlex.split(message.text)[1:]
+    args = _split_command_args(message.text)[1:]
     if not args:
         await message.answer("Usage: /prize_info <contest_id>\n\nExample: /prize_info 1")
         return
@@ -1727,20 +1844,13 @@ async def prize_info_command(message: types.Message):
     try:
         contest_id = int(args[0])
         
-        from db import get_contest_prizes
-        prize_details = await get_contest_prizes(contest_id, DB_CONFIG)
-        
+        contest = await get_contest_with_prizes(contest_id, DB_CONFIG)
+        prize_details = contest['prizes_detail'] if contest else []
+
         if prize_details:
-            message_text = f"🎁 Prize Info for Contest {contest_id}:\n\n"
+            message_text = f"🎁 Prize Info for Contest {contest_id} ('{contest['name']}'):\n\n"
             for prize in prize_details:
-                if prize['position'] == 1:
-                    position_emoji = "🥇"
-                elif prize['position'] == 2:
-                    position_emoji = "🥈"
-                elif prize['position'] == 3:
-                    position_emoji = "🥉"
-                else:
-                    position_emoji = "🏆"
+                position_emoji = _position_emoji(prize['position'], overflow="🏆")
                 message_text += f"{position_emoji} Position {prize['position']}:\n"
                 message_text += f"📝 Prize: {prize['prize_name']}\n"
                 message_text += f"🔗 Type: {prize['prize_type']}\n"
@@ -1767,28 +1877,27 @@ async def my_rewards_command(message: types.Message):
         return
     
     try:
-        from db import get_user_rewards
         rewards = await get_user_rewards(user_id, DB_CONFIG)
         
         if not rewards:
             await message.answer("😿 You don't have any prizes yet. Participate in giveaways! 🎯")
             return
         
-        message_text = "🏆 **Your Prizes:**\n\n"
-        
+        parts = ["🏆 **Your Prizes:**\n\n"]
+
         for reward in rewards:
             status = "✅ Claimed" if reward['claimed_at'] else "⏳ Pending"
-            message_text += f"🎁 **{reward['prize_name']}**\n"
-            message_text += f"📅 Contest: {reward['contest_name']}\n"
-            message_text += f"🏅 Position: {reward['position']}\n"
-            message_text += f"📊 Status: {status}\n"
+            parts.append(f"🎁 **{reward['prize_name']}**\n")
+            parts.append(f"📅 Contest: {reward['contest_name']}\n")
+            parts.append(f"🏅 Position: {reward['position']}\n")
+            parts.append(f"📊 Status: {status}\n")
             if reward['claimed_at']:
-                message_text += f"⏰ Claimed: {reward['claimed_at']}\n"
-            message_text += "\n"
-        
-        message_text += "💡 Use /claim to get unclaimed prizes!"
-        
-        await message.answer(message_text, parse_mode="Markdown")
+                parts.append(f"⏰ Claimed: {reward['claimed_at']}\n")
+            parts.append("\n")
+
+        parts.append("💡 Use /claim to get unclaimed prizes!")
+
+        await message.answer(''.join(parts), parse_mode="Markdown")
         claim_logger.info(f"User {user_id} requested their rewards")
         
     except Exception as e:
@@ -1834,8 +1943,8 @@ async def help_command(message: types.Message):
     await message.answer(help_text, parse_mode="Markdown")
 
 @dp.message(Command("cancel_giveaway"))
-async def cancel_giveaway_command(message: types.Message):
-    global participants, winners, claimed_winners, current_contest_id, giveaway_message_id, giveaway_chat_id, giveaway_has_image
+async def cancel_giveaway_command(message: types.Message, is_admin: bool = False):
+    global winners, claimed_winners, current_contest_id, giveaway_message_id, giveaway_chat_id, giveaway_has_image, giveaway_end_at
     
     logger.info(f"Cancel giveaway command by user {message.from_user.id} in chat {message.chat.id}")
     
@@ -1843,14 +1952,8 @@ async def cancel_giveaway_command(message: types.Message):
         await message.answer(CHAT_NOT_AUTHORIZED)
         return
     
-    try:
-        chat_member = await bot.get_chat_member(message.chat.id, message.from_user.id)
-        if chat_member.status not in ["creator", "administrator"]:
-            await message.answer("Only admins can cancel giveaways.")
-            return
-    except Exception as e:
-        logger.error(f"Error checking admin status: {e}")
-        await message.answer(ERROR_CHECKING_ADMIN_STATUS)
+    if not is_admin:
+        await message.answer("Only admins can cancel giveaways.")
         return
     
     if not is_giveaway_running():
@@ -1858,7 +1961,7 @@ async def cancel_giveaway_command(message: types.Message):
         return
     
     try:
-        contest = await get_contest_by_id(current_contest_id)
+        contest = await get_contest_cached(current_contest_id)
         if not contest:
             await message.answer("Contest not found.")
             return
@@ -1895,59 +1998,83 @@ async def cancel_giveaway_command(message: types.Message):
             except Exception as e:
                 logger.error(f"Failed to update giveaway message for cancellation: {e}")
         
-        participants.clear()
+        participant_ids.clear()
+        participants_cache.clear()
+        del participants_list[:]
         winners.clear()
         claimed_winners.clear()
+        _invalidate_state_blobs()
+        _invalidate_contest_cache(current_contest_id)
         current_contest_id = None
         giveaway_message_id = None
         giveaway_chat_id = None
         giveaway_has_image = False
-        giveaway_task = None
+        giveaway_end_at = None
+        # Awaited directly: if this snapshot is lost to a crash before
+        # the flusher runs, the cancelled contest comes back on restart.
         await save_state_to_db()
-        
+
         await message.answer(f"Giveaway '{contest['name']}' has been cancelled.")
         logger.info(f"Giveaway cancelled by user {message.from_user.id}")
     except Exception as e:
         await message.answer(f"Error cancelling giveaway: {e}")
         logger.error(f"Error cancelling giveaway: {e}")
 
+# str.startswith dispatches over a tuple in C, so the catch-all handler
+# does one scan instead of nine Python-level calls per message.
+_CMD_PREFIXES = ('/claim', '/start_giveaway', '/contest', '/create_contest', '/stats',
+                 '/set_prize_data', '/prize_info', '/help', '/cancel_giveaway')
+
 @dp.message()
 async def handle_any_message(message: types.Message):
-    logger.info(f"Received message: '{message.text}' from user {message.from_user.id} in chat {message.chat.id}")
-    logger.info(f"ALLOWED_CHATS: {ALLOWED_CHATS}")
-    logger.info(f"Chat in whitelist: {message.chat.id in ALLOWED_CHATS}")
-    
-    if (not message.text or not (message.text.startswith('/claim') or message.text.startswith('/start_giveaway') or message.text.startswith('/contest') or message.text.startswith('/create_contest') or message.text.startswith('/stats') or message.text.startswith('/set_prize_data') or message.text.startswith('/prize_info') or message.text.startswith('/help') or message.text.startswith('/cancel_giveaway'))) and message.chat.id not in ALLOWED_CHATS:
-        logger.warning(f"Sending backward compatibility message for chat {message.chat.id}")
-        await message.answer(CHAT_NOT_AUTHORIZED)
+    # %-style so the arguments are only formatted when DEBUG is enabled;
+    # this fires for every message the bot sees.
+    logger.debug("Received message: %r from user %s in chat %s",
+                 message.text, message.from_user.id, message.chat.id)
+
+    # Whitelisted chats are the common case; bail before even looking at
+    # the command prefixes.
+    if message.chat.id in ALLOWED_CHATS:
+        return
+    if message.text and message.text.startswith(_CMD_PREFIXES):
+        return
+
+    logger.warning(f"Sending backward compatibility message for chat {message.chat.id}")
+    # model_construct skips pydantic field validation — both arguments
+    # are already known-good, and this fires for all unsolicited traffic.
+    await bot(SendMessage.model_construct(chat_id=message.chat.id, text=CHAT_NOT_AUTHORIZED))
 
 if __name__ == "__main__":
-    async def main():   
-        global current_contest_id, participants, winners, giveaway_task
+    try:
+        import uvloop
+        uvloop.install()
+        logger.info("uvloop event loop policy installed")
+    except ImportError:
+        pass
+
+    async def main():
+        global current_contest_id, winners
         
         validate_config()
-        from db import init_database
         await init_database(DB_CONFIG)
         
         await load_state_from_db()
         
-        from db import get_active_contests
         active_contests = await get_active_contests(DB_CONFIG)
         
         if active_contests:
             logger.info(f"Found {len(active_contests)} active contests to restore")
-            global restore_tasks
             for contest in active_contests:
                 logger.info(f"Restoring contest ID {contest['id']}: {contest['name']}")
-                task = asyncio.create_task(end_giveaway(contest['duration'], contest['winners_count'], contest['prizes']))
-                restore_tasks.append(task)
+                fire_at = giveaway_end_at or (time.time() + contest['duration'])
+                schedule_giveaway_end(fire_at, contest['winners_count'], contest['prizes'])
         elif current_contest_id:
             logger.info(f"Restoring active contest ID {current_contest_id}")
-            contest = await get_contest_by_id(current_contest_id)
+            contest = await get_contest_cached(current_contest_id)
             if contest:
-                logger.info(f"Bot restored active giveaway: contest_id={current_contest_id}, participants={len(participants)}, winners={len(winners)}")
-                global giveaway_task
-                giveaway_task = asyncio.create_task(end_giveaway(contest['duration'], contest['winners_count'], contest['prizes']))
+                logger.info(f"Bot restored active giveaway: contest_id={current_contest_id}, participants={len(participant_ids)}, winners={len(winners)}")
+                fire_at = giveaway_end_at or (time.time() + contest['duration'])
+                schedule_giveaway_end(fire_at, contest['winners_count'], contest['prizes'])
             else:
                 logger.warning("Contest not found during restore, clearing state.")
                 current_contest_id = None
@@ -1955,13 +2082,19 @@ if __name__ == "__main__":
         else:
             logger.info("No active contests to restore")
         
-        global state_monitor_task, cleanup_task
+        global state_monitor_task, cleanup_task, state_flusher_task, giveaway_scheduler_task
         state_monitor_task = asyncio.create_task(state_monitor())
         cleanup_task = asyncio.create_task(auto_cleanup())
+        state_flusher_task = asyncio.create_task(_state_flusher())
+        giveaway_scheduler_task = asyncio.create_task(_giveaway_scheduler())
         logger.info("🔄 State monitoring started")
         logger.info("🧹 Auto cleanup started")
         
         logger.info("Bot starting with restored state")
-        await dp.start_polling(bot)
+        try:
+            await dp.start_polling(bot)
+        finally:
+            if _http_session is not None and not _http_session.closed:
+                await _http_session.close()
     
     asyncio.run(main())
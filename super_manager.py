@@ -12,16 +12,52 @@ import aiomysql
 
 load_dotenv()
 
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.mount('http://', requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+REQUIRED_ENV_VARS = {
+    'TELEGRAM_TOKEN': 'Telegram bot token',
+    'DB_HOST': 'Database host',
+    'DB_USER': 'Database user',
+    'DB_PASSWORD': 'Database password',
+    'DB_NAME': 'Database name'
+}
+
+ENV_VALUES = {var: os.getenv(var, "") for var in REQUIRED_ENV_VARS}
+
+DB_CONFIG = {
+    'host': ENV_VALUES['DB_HOST'],
+    'port': int(os.getenv("DB_PORT", "3306")),
+    'user': ENV_VALUES['DB_USER'],
+    'password': ENV_VALUES['DB_PASSWORD'],
+    'db': ENV_VALUES['DB_NAME'],
+    'charset': 'utf8mb4'
+}
+
+PROCESS_PATTERNS = ('main.py', 'giveaway_bot.py', 'uvicorn')
+
+def count_processes(patterns=PROCESS_PATTERNS):
+    counts = dict.fromkeys(patterns, 0)
+    needles = tuple((pattern, pattern.encode()) for pattern in patterns)
+    own_pid = str(os.getpid())
+    for entry in os.scandir('/proc'):
+        name = entry.name
+        # cheap first-char test; /proc pid dirs are all-digit names
+        if not ('0' <= name[0] <= '9') or name == own_pid:
+            continue
+        try:
+            with open(f"/proc/{name}/cmdline", "rb") as f:
+                cmdline = f.read()
+        except OSError:
+            continue
+        for pattern, needle in needles:
+            if needle in cmdline:
+                counts[pattern] += 1
+    return counts
+
 class SuperManager:
     def __init__(self):
-        self.db_config = {
-            'host': os.getenv("DB_HOST", ""),
-            'port': int(os.getenv("DB_PORT", "3306")),
-            'user': os.getenv("DB_USER", ""),
-            'password': os.getenv("DB_PASSWORD", ""),
-            'db': os.getenv("DB_NAME", ""),
-            'charset': 'utf8mb4'
-        }
+        self.db_config = DB_CONFIG
     
     def print_header(self, title):
         print(f"\n{'='*50}")
@@ -31,24 +67,23 @@ class SuperManager:
     def stop_all_processes(self):
         self.print_header("Stopping processes")
         
-        processes = ['main.py', 'giveaway_bot.py', 'uvicorn']
-        for process in processes:
-            try:
-                result = subprocess.run(['pkill', '-f', process], capture_output=True)
-                if result.returncode == 0:
-                    print(f"Stopped: {process}")
-                else:
-                    print(f"Not found: {process}")
-            except Exception as e:
-                print(f"Error stopping {process}: {e}")
-        
+        pattern = '|'.join(p.replace('.', '\\.') for p in PROCESS_PATTERNS)
+        try:
+            result = subprocess.run(['pkill', '-f', pattern], capture_output=True)
+            if result.returncode == 0:
+                print(f"Stopped: {', '.join(PROCESS_PATTERNS)}")
+            else:
+                print("No matching processes found")
+        except Exception as e:
+            print(f"Error stopping processes: {e}")
+
         time.sleep(2)
         print("All processes stopped!")
     
     async def check_bot_token(self):
         self.print_header("Checking bot token")
         
-        token = os.getenv("TELEGRAM_TOKEN")
+        token = ENV_VALUES['TELEGRAM_TOKEN']
         if not token:
             print("TELEGRAM_TOKEN not set!")
             return False
@@ -72,17 +107,9 @@ class SuperManager:
     def check_environment(self):
         self.print_header("Checking environment variables")
         
-        required_vars = {
-            'TELEGRAM_TOKEN': 'Telegram bot token',
-            'DB_HOST': 'Database host',
-            'DB_USER': 'Database user',
-            'DB_PASSWORD': 'Database password',
-            'DB_NAME': 'Database name'
-        }
-        
         missing_vars = []
-        for var, description in required_vars.items():
-            value = os.getenv(var)
+        for var, description in REQUIRED_ENV_VARS.items():
+            value = ENV_VALUES[var]
             if not value:
                 missing_vars.append(f"{var} ({description})")
             else:
@@ -107,22 +134,14 @@ class SuperManager:
         try:
             conn = await aiomysql.connect(**self.db_config)
             async with conn.cursor() as cursor:
-                tables_to_drop = [
-                    'prize_claims',
-                    'contest_prizes', 
-                    'prizes',
-                    'contests',
-                    'giveaway_state'
-                ]
-                
-                for table in tables_to_drop:
-                    try:
-                        await cursor.execute(f"DROP TABLE IF EXISTS {table}")
-                        print(f"Dropped table: {table}")
-                    except Exception as e:
-                        print(f"Could not drop {table}: {e}")
-                
+                await cursor.execute("SET FOREIGN_KEY_CHECKS=0")
+                await cursor.execute(
+                    "DROP TABLE IF EXISTS prize_claims, contest_prizes, contest_participants, prizes, contests, giveaway_state"
+                )
+                await cursor.execute("SET FOREIGN_KEY_CHECKS=1")
+
                 await conn.commit()
+                print("Dropped tables: prize_claims, contest_prizes, contest_participants, prizes, contests, giveaway_state")
                 print("\nDatabase reset complete!")
                 
         except Exception as e:
@@ -169,13 +188,11 @@ class SuperManager:
         self.print_header("Checking system status")
         
         try:
-            result = subprocess.run(['ps', 'aux'], capture_output=True, text=True)
-            processes = result.stdout
-            
-            main_count = len([line for line in processes.split('\n') if 'main.py' in line and 'grep' not in line])
-            bot_count = len([line for line in processes.split('\n') if 'giveaway_bot.py' in line and 'grep' not in line])
-            uvicorn_count = len([line for line in processes.split('\n') if 'uvicorn' in line and 'grep' not in line])
-            
+            counts = count_processes()
+            main_count = counts['main.py']
+            bot_count = counts['giveaway_bot.py']
+            uvicorn_count = counts['uvicorn']
+
             print(f"Main processes: {main_count}")
             print(f"Bot processes: {bot_count}")
             print(f"Web processes: {uvicorn_count}")
@@ -185,8 +202,9 @@ class SuperManager:
                 
                 # Check web interface availability
                 try:
-                    response = requests.get('http://localhost:3001/', timeout=5)
-                    if response.status_code == 200:
+                    response = HTTP_SESSION.head('http://localhost:3001/', timeout=(1, 2),
+                                                 allow_redirects=False)
+                    if response.status_code == 200 or 300 <= response.status_code < 400 or response.status_code == 405:
                         print("Web interface is available: http://localhost:3001")
                     else:
                         print(f"Web interface not available (status: {response.status_code})")
@@ -272,23 +290,30 @@ class SuperManager:
     async def check_all(self):
         self.print_header("Checking all components")
         
-        checks = [
+        # Sequential on purpose: every check reports through print, and
+        # running them concurrently interleaves their lines into an
+        # unreadable report.
+        checks = (
             ("Environment variables", self.check_environment),
             ("Bot token", self.check_bot_token),
-            ("System status", self.check_system_status)
-        ]
-        
+            ("System status", self.check_system_status),
+        )
+
         all_passed = True
         for check_name, check_func in checks:
             print(f"\n{check_name}:")
-            if asyncio.iscoroutinefunction(check_func):
-                result = await check_func()
-            else:
-                result = check_func()
-            
+            try:
+                if asyncio.iscoroutinefunction(check_func):
+                    result = await check_func()
+                else:
+                    result = check_func()
+            except Exception as e:
+                print(f"\n{check_name} check failed: {e}")
+                result = False
+
             if not result:
                 all_passed = False
-        
+
         if all_passed:
             print("\nAll checks passed!")
         else: